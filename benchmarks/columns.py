@@ -0,0 +1,56 @@
+"""Decode of many small records into columns.
+
+Usage: python benchmarks/columns.py [--records 50000] [--number 5]
+"""
+import sys
+import random
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Record(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+    score: types.DOUBLE = JceField(0.0, jce_id=2)
+    active: types.BOOL = JceField(False, jce_id=3)
+    count: types.INT32 = JceField(0, jce_id=4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    payloads = [
+        Record(
+            id=rng.randint(0, 1 << 40),
+            name=f"record{i}",
+            score=rng.random(),
+            active=rng.random() < 0.5,
+            count=rng.randint(0, 100000),
+        ).encode()
+        for i in range(args.records)
+    ]
+
+    print(f"{args.records} records, {sum(map(len, payloads))} bytes")
+    for name, func in (
+        ("JceStruct.decode", lambda: [Record.decode(p) for p in payloads]),
+        (
+            "JceStruct.decode_native",
+            lambda: [Record.decode_native(p) for p in payloads],
+        ),
+        ("JceStruct.decode_columns", lambda: Record.decode_columns(payloads)),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:<28} {elapsed * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Decode of a struct holding a large list of nested structs.
+
+Usage: python benchmarks/decode.py [--items 20000] [--number 5]
+"""
+import sys
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Item(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+    score: types.DOUBLE = JceField(0.0, jce_id=2)
+    tags: types.LIST[types.STRING] = JceField([], jce_id=3)
+
+
+class Response(JceStruct):
+    items: types.LIST[Item] = JceField(jce_id=0)
+    index: types.MAP[types.STRING, types.INT32] = JceField({}, jce_id=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    data = Response(
+        items=[
+            Item(id=i, name=f"item{i}", score=i / 3, tags=["a", "b"])
+            for i in range(args.items)
+        ],
+        index={f"item{i}": i for i in range(args.items // 4)},
+    ).encode()
+
+    print(f"payload {len(data)} bytes, {args.items} items")
+    for name, func in (
+        ("JceStruct.decode", lambda: Response.decode(data)),
+        ("JceStruct.decode_list", lambda: Item.decode_list(data, jce_id=0)),
+        ("JceStruct.decode_native", lambda: Response.decode_native(data)),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:<28} {elapsed * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
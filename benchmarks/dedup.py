@@ -0,0 +1,77 @@
+"""Native decode of a response with repeated nested values, with Dedup.
+
+Usage: python benchmarks/dedup.py [--servers 20000] [--number 3]
+"""
+import sys
+import timeit
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce.types import Dedup
+from jce import JceField, JceStruct, types
+
+
+class Location(JceStruct):
+    city: types.STRING = JceField(jce_id=0)
+    tags: types.LIST[types.STRING] = JceField([], jce_id=1)
+
+
+class Server(JceStruct):
+    host: types.STRING = JceField(jce_id=0)
+    port: types.INT32 = JceField(jce_id=1)
+    location: Location = JceField(jce_id=2)
+
+
+class Response(JceStruct):
+    servers: types.LIST[Server] = JceField(jce_id=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, default=20000)
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+
+    locations = [
+        Location(city=city, tags=["cn", "fast", city])
+        for city in ("sz", "tj", "sh", "bj")
+    ]
+    data = Response(
+        servers=[
+            Server(
+                host=f"10.0.{i // 256}.{i % 256}",
+                port=8080,
+                location=locations[i % len(locations)],
+            )
+            for i in range(args.servers)
+        ]
+    ).encode()
+
+    print(f"payload {len(data)} bytes, {args.servers} servers")
+    for name, func in (
+        ("decode_native", lambda: Response.decode_native(data)),
+        (
+            "decode_native + Dedup",
+            lambda: Response.decode_native(data, dedup=Dedup()),
+        ),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        tracemalloc.start()
+        value = func()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del value
+        print(
+            f"{name:<28} {elapsed * 1e3:10.1f} ms"
+            f" {size / (1 << 20):8.1f} MiB retained"
+        )
+    dedup = Dedup()
+    Response.decode_native(data, dedup=dedup)
+    print(dedup)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Encoding plain python containers by their declared item types.
+
+Usage: python benchmarks/encode.py [--items 100000] [--number 20]
+"""
+import sys
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Record(JceStruct):
+    ids: types.LIST[types.INT64] = JceField(jce_id=0)
+    names: types.MAP[types.STRING, types.BYTES] = JceField(jce_id=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    ids = list(range(args.items))
+    names = {str(i): b"value" for i in range(args.items)}
+    plain = Record.construct(ids=ids, names=names)
+
+    def wrapped():
+        types.LIST.to_bytes(0, types.LIST.validate(ids))
+        types.MAP.to_bytes(
+            1, {types.STRING(k): types.BYTES(v) for k, v in names.items()}
+        )
+
+    def typed():
+        types.LIST.to_bytes(0, ids, (types.INT64,))
+        types.MAP.to_bytes(1, names, (types.STRING, types.BYTES))
+
+    def struct_plain():
+        plain.encode()
+
+    print(f"{args.items} list items, {args.items} map items")
+    for name, func in (
+        ("wrap every item, then encode", wrapped),
+        ("encode by declared item types", typed),
+        ("JceStruct.encode of plain values", struct_plain),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:<36} {elapsed * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Encode of a struct holding a large BYTES blob, as bytes and as buffers.
+
+Usage: python benchmarks/encode_iov.py [--size 50] [--number 5]
+"""
+import sys
+import timeit
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Upload(JceStruct):
+    name: types.STRING = JceField(jce_id=0)
+    offset: types.INT64 = JceField(0, jce_id=1)
+    data: types.BYTES = JceField(jce_id=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=50, help="blob MiB")
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    upload = Upload(name="upload.bin", data=bytes(args.size << 20))
+
+    print(f"blob {args.size} MiB")
+    for name, func in (
+        ("JceStruct.encode", upload.encode),
+        ("JceStruct.encode_iov", upload.encode_iov),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"{name:<28} {elapsed * 1e3:10.1f} ms"
+            f" {peak / (1 << 20):8.1f} MiB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
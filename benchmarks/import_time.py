@@ -0,0 +1,103 @@
+"""Import time of a generated schema package with many struct classes.
+
+Usage: python benchmarks/import_time.py [--structs 500] [--repeat 5]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FIELD_TYPES = [
+    "types.INT32",
+    "types.INT64",
+    "types.STRING",
+    "types.BYTES",
+    "types.DOUBLE",
+    "types.MAP[types.STRING, types.BYTES]",
+]
+
+
+def generate_package(path: Path, count: int) -> None:
+    package = path / "schema"
+    package.mkdir()
+    lines = [
+        "from typing import Optional",
+        "",
+        "from jce import JceField, JceStruct, types",
+        "",
+    ]
+    for index in range(count):
+        lines.append(f"class Struct{index}(JceStruct):")
+        for jce_id, type_ in enumerate(FIELD_TYPES):
+            lines.append(
+                f"    field{jce_id}: Optional[{type_}] = "
+                f"JceField(None, jce_id={jce_id})"
+            )
+        if index:
+            lines.append(
+                f"    child: types.LIST[Struct{index - 1}] = "
+                f"JceField([], jce_id={len(FIELD_TYPES)})"
+            )
+        lines.append("")
+    (package / "__init__.py").write_text("\n".join(lines))
+
+
+def measure(path: Path, code: str, repeat: int) -> float:
+    env_path = os.pathsep.join((str(ROOT), str(path)))
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                "import time\n"
+                "start = time.perf_counter()\n"
+                f"{code}\n"
+                "print(time.perf_counter() - start)",
+            ],
+            env={"PYTHONPATH": env_path},
+        )
+        timings.append(float(output))
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--structs", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory)
+        generate_package(path, args.structs)
+        last = f"Struct{args.structs - 1}"
+        cases = {
+            "import jce": "import jce",
+            "import jce + types": "import jce.types",
+            f"import schema ({args.structs} structs)": "import schema",
+            "import schema + first encode": (
+                f"import schema\nschema.{last}().encode()"
+            ),
+            # everything encoding and decoding caches on the classes
+            "import schema + jce metadata of all": (
+                "import schema\n"
+                "from jce.types import JceStruct, _struct_schema\n"
+                "for struct in vars(schema).values():\n"
+                "    if isinstance(struct, type) and "
+                "issubclass(struct, JceStruct):\n"
+                "        _struct_schema(struct)"
+            ),
+        }
+        for name, code in cases.items():
+            print(
+                f"{name:<40} {measure(path, code, args.repeat) * 1000:8.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Peak memory and time of decode_list against iter_list on a large list.
+
+Usage: python benchmarks/iter_list.py [--items 100000]
+"""
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Item(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+
+
+class Response(JceStruct):
+    items: types.LIST[Item] = JceField(jce_id=0)
+
+
+def measure(name: str, func) -> None:
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    # traced separately, tracemalloc slows everything down
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<24} {count:>8} items {elapsed:8.2f} s "
+        f"peak {peak / 2**20:8.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    args = parser.parse_args()
+
+    data = Response(
+        items=[Item(id=i, name=f"item{i}") for i in range(args.items)]
+    ).encode()
+    print(f"payload {len(data)} bytes")
+
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        del data
+
+        def decode_list() -> int:
+            f.seek(0)
+            return len(Item.decode_list(f.read(), jce_id=0))
+
+        def iter_list() -> int:
+            f.seek(0)
+            return sum(1 for _ in Item.iter_list(f, jce_id=0))
+
+        measure("decode_list (read all)", decode_list)
+        measure("iter_list (file)", iter_list)
+
+
+if __name__ == "__main__":
+    main()
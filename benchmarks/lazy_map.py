@@ -0,0 +1,70 @@
+"""Decode of a large map and a few lookups, MAP and LAZY_MAP.
+
+Usage: python benchmarks/lazy_map.py [--entries 20000] [--lookups 5]
+"""
+import sys
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Profile(JceStruct):
+    uid: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+    avatar: types.BYTES = JceField(jce_id=2)
+    tags: types.LIST[types.STRING] = JceField(jce_id=3)
+
+
+class Profiles(JceStruct):
+    profiles: types.MAP[types.INT64, Profile] = JceField(jce_id=0)
+
+
+class LazyProfiles(JceStruct):
+    profiles: types.LAZY_MAP[types.INT64, Profile] = JceField(jce_id=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=5)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    uids = [10_000_000 + i * 7 for i in range(args.entries)]
+    data = Profiles(
+        profiles={
+            uid: Profile(
+                uid=uid,
+                name=f"user {uid}",
+                avatar=bytes(64),
+                tags=["a", "b", "c"],
+            )
+            for uid in uids
+        }
+    ).encode()
+    wanted = uids[:: max(len(uids) // args.lookups, 1)][: args.lookups]
+
+    def lookup(struct):
+        profiles = struct.decode(data).profiles
+        return [profiles[uid].name for uid in wanted]
+
+    assert lookup(Profiles) == lookup(LazyProfiles)
+
+    print(f"payload {len(data)} bytes, {args.entries} entries")
+    for name, func in (
+        ("MAP decode", lambda: Profiles.decode(data)),
+        ("LAZY_MAP decode", lambda: LazyProfiles.decode(data)),
+        ("MAP lookups", lambda: lookup(Profiles)),
+        ("LAZY_MAP lookups", lambda: lookup(LazyProfiles)),
+        ("LAZY_MAP forward", lambda: LazyProfiles.decode(data).encode()),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:<28} {elapsed * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
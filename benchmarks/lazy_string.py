@@ -0,0 +1,57 @@
+"""Decode and re-encode of records with long strings, STRING and LAZY_STRING.
+
+Usage: python benchmarks/lazy_string.py [--records 1000] [--size 4096]
+"""
+import sys
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Log(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    body: types.STRING = JceField(jce_id=1)
+
+
+class LazyLog(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    body: types.LAZY_STRING = JceField(jce_id=1)
+
+
+class Batch(JceStruct):
+    logs: types.LIST[Log] = JceField(jce_id=0)
+
+
+class LazyBatch(JceStruct):
+    logs: types.LIST[LazyLog] = JceField(jce_id=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    body = ("日志 line " * args.size)[: args.size]
+    data = Batch(
+        logs=[Log(id=i, body=body) for i in range(args.records)]
+    ).encode()
+
+    print(f"payload {len(data)} bytes, {args.records} records")
+    for name, func in (
+        ("STRING decode", lambda: Batch.decode(data)),
+        ("LAZY_STRING decode", lambda: LazyBatch.decode(data)),
+        ("STRING forward", lambda: Batch.decode(data).encode()),
+        ("LAZY_STRING forward", lambda: LazyBatch.decode(data).encode()),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:<28} {elapsed * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Decode and encode of a RequestPacket envelope with a large inner struct.
+
+Usage: python benchmarks/packet.py [--items 1000] [--number 200]
+"""
+import sys
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, JceDecoder, RequestPacket, types
+
+
+class Envelope(JceStruct):
+    version: types.INT16 = JceField(0, jce_id=1)
+    packet_type: types.BYTE = JceField(bytes(1), jce_id=2)
+    message_type: types.INT32 = JceField(0, jce_id=3)
+    request_id: types.INT32 = JceField(0, jce_id=4)
+    servant_name: types.STRING = JceField(jce_id=5)
+    func_name: types.STRING = JceField(jce_id=6)
+    buffer: types.BYTES = JceField(jce_id=7)
+    timeout: types.INT32 = JceField(0, jce_id=8)
+    context: types.MAP[types.STRING, types.STRING] = JceField({}, jce_id=9)
+    status: types.MAP[types.STRING, types.STRING] = JceField({}, jce_id=10)
+
+
+class Item(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+
+
+class Response(JceStruct):
+    items: types.LIST[Item] = JceField(jce_id=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    response = Response(
+        items=[Item(id=i, name=f"item{i}") for i in range(args.items)]
+    )
+    packet = RequestPacket("service", "method")
+    packet.put("resp", response)
+    encoded = packet.encode()
+
+    def envelope_header():
+        Envelope.decode(encoded)
+
+    def envelope_full():
+        envelope = Envelope.decode(encoded)
+        buffer = JceDecoder.decode_bytes(envelope.buffer)[0]
+        Response.decode(buffer["resp"][1:-1])
+
+    def packet_header():
+        RequestPacket.decode(encoded).names()
+
+    def packet_full():
+        RequestPacket.decode(encoded).get("resp", Response)
+
+    def envelope_encode():
+        Envelope(
+            version=3,
+            servant_name="service",
+            func_name="method",
+            buffer=types.MAP.to_bytes(
+                0,
+                {
+                    types.STRING("resp"): types.BYTES(
+                        Response.to_bytes(0, response)
+                    )
+                },
+            ),
+        ).encode()
+
+    body = response.encode()
+
+    def packet_encode():
+        packet = RequestPacket("service", "method")
+        packet.put("resp", body)
+        packet.encode()
+
+    print(f"payload {len(encoded)} bytes, {args.items} items")
+    for name, func in (
+        ("JceStruct envelope, header only", envelope_header),
+        ("RequestPacket, header only", packet_header),
+        ("JceStruct envelope + inner decode", envelope_full),
+        ("RequestPacket + inner decode", packet_full),
+        ("JceStruct envelope encode", envelope_encode),
+        ("RequestPacket encode (pre-encoded body)", packet_encode),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:<42} {elapsed * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Pickle size and speed of a decoded struct, default and with jce_pickle.
+
+Usage: python benchmarks/pickling.py [--items 1000] [--number 20]
+"""
+import sys
+import pickle
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Item(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+    score: types.DOUBLE = JceField(0.0, jce_id=2)
+    tags: types.LIST[types.STRING] = JceField([], jce_id=3)
+
+
+class Response(JceStruct):
+    items: types.LIST[Item] = JceField(jce_id=0)
+    index: types.MAP[types.STRING, types.INT32] = JceField({}, jce_id=1)
+
+
+class PicklingResponse(Response):
+    class Config:
+        jce_pickle = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    data = Response(
+        items=[
+            Item(id=i, name=f"item{i}", score=i / 3, tags=["a", "b"])
+            for i in range(args.items)
+        ],
+        index={f"item{i}": i for i in range(args.items // 4)},
+    ).encode()
+
+    print(f"payload {len(data)} bytes, {args.items} items")
+    for name, struct in (
+        ("default", Response),
+        ("jce_pickle", PicklingResponse),
+    ):
+        value = struct.decode(data)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        dumps = timeit.timeit(
+            lambda: pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            number=args.number,
+        )
+        loads = timeit.timeit(lambda: pickle.loads(pickled), number=args.number)
+        print(
+            f"{name:<12} {len(pickled):10d} bytes"
+            f" dumps {dumps / args.number * 1e3:8.2f} ms"
+            f" loads {loads / args.number * 1e3:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
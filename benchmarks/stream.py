@@ -0,0 +1,63 @@
+"""Encode of a huge LIST field to a file, at once and with StreamEncoder.
+
+Usage: python benchmarks/stream.py [--items 200000]
+"""
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, StreamEncoder, types
+
+
+class Item(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+
+
+class Response(JceStruct):
+    code: types.INT32 = JceField(jce_id=0)
+    items: types.LIST[Item] = JceField(jce_id=1)
+
+
+def items(count: int):
+    return (Item.construct(id=i, name=f"item{i}") for i in range(count))
+
+
+def encode(fp, count: int) -> None:
+    fp.write(Response(code=0, items=list(items(count))).encode())
+
+
+def stream(fp, count: int) -> None:
+    with StreamEncoder(fp, Response) as encoder:
+        encoder.write("code", 0)
+        encoder.write_list("items", items(count))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{args.items} items")
+    for name, func in (("JceStruct.encode", encode), ("StreamEncoder", stream)):
+        with tempfile.TemporaryFile() as fp:
+            tracemalloc.start()
+            start = time.perf_counter()
+            func(fp, args.items)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = fp.tell()
+        print(
+            f"{name:<28} {elapsed:8.2f} s {peak / (1 << 20):8.1f} MiB peak"
+            f" {size} bytes"
+        )
+
+
+if __name__ == "__main__":
+    main()
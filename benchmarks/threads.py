@@ -0,0 +1,76 @@
+"""Struct decode throughput with 1 to N threads in one process.
+
+Scaling needs a free-threaded CPython build (python3.13t or newer), with
+the GIL the threads only take turns.
+
+Usage: python benchmarks/threads.py [--threads 8] [--records 2000]
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, JceDecoder, types
+
+
+class Item(JceStruct):
+    id: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+    tags: types.LIST[types.STRING] = JceField([], jce_id=2)
+
+
+class Record(JceStruct):
+    items: types.LIST[Item] = JceField(jce_id=0)
+    attrs: types.MAP[types.STRING, types.INT32] = JceField({}, jce_id=1)
+
+
+def run(threads: int, records: int, encoded: bytes, target) -> float:
+    def work(_) -> None:
+        for _ in range(records):
+            target(encoded)
+
+    with ThreadPoolExecutor(threads) as executor:
+        start = time.perf_counter()
+        list(executor.map(work, range(threads)))
+        elapsed = time.perf_counter() - start
+    return threads * records / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--records", type=int, default=2000)
+    args = parser.parse_args()
+
+    encoded = Record(
+        items=[Item(id=i, name=f"item{i}", tags=["a", "b"]) for i in range(10)],
+        attrs={"x": 1, "y": 2},
+    ).encode()
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+
+    counts = sorted({1, *range(2, args.threads + 1, 2), args.threads})
+    for name, target in (
+        ("Record.decode", Record.decode),
+        ("JceDecoder.decode_bytes", JceDecoder.decode_bytes),
+    ):
+        base = run(1, args.records, encoded, target)
+        print(name)
+        for threads in counts:
+            rate = (
+                base
+                if threads == 1
+                else run(threads, args.records, encoded, target)
+            )
+            print(
+                f"  {threads:3d} threads {rate:12.0f} records/s "
+                f"{rate / base:6.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
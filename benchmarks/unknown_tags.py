@@ -0,0 +1,85 @@
+"""Decode of records with tags the struct does not declare.
+
+Usage: python benchmarks/unknown_tags.py [--records 1000] [--number 10]
+"""
+import sys
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Profile(JceStruct):
+    uid: types.INT64 = JceField(jce_id=0)
+    name: types.STRING = JceField(jce_id=1)
+    tags: types.LIST[types.STRING] = JceField(jce_id=2)
+    scores: types.MAP[types.STRING, types.DOUBLE] = JceField(jce_id=3)
+
+
+class Batch(JceStruct):
+    profiles: types.LIST[Profile] = JceField(jce_id=0)
+
+
+# only knows the uid of an older schema
+class OldProfile(JceStruct):
+    uid: types.INT64 = JceField(jce_id=0)
+
+
+class SkipProfile(OldProfile):
+    class Config:
+        jce_unknown_tags = "skip"
+
+
+class PreserveProfile(OldProfile):
+    class Config:
+        jce_unknown_tags = "preserve"
+
+
+class OldBatch(JceStruct):
+    profiles: types.LIST[OldProfile] = JceField(jce_id=0)
+
+
+class SkipBatch(JceStruct):
+    profiles: types.LIST[SkipProfile] = JceField(jce_id=0)
+
+
+class PreserveBatch(JceStruct):
+    profiles: types.LIST[PreserveProfile] = JceField(jce_id=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    data = Batch(
+        profiles=[
+            Profile(
+                uid=i,
+                name=f"user {i}",
+                tags=[f"tag {j}" for j in range(10)],
+                scores={f"score {j}": j / 3 for j in range(10)},
+            )
+            for i in range(args.records)
+        ]
+    ).encode()
+    assert PreserveBatch.decode(data).encode() == data
+
+    print(f"payload {len(data)} bytes, {args.records} records")
+    for name, func in (
+        ("known tags", lambda: Batch.decode(data)),
+        ("unknown decoded", lambda: OldBatch.decode(data)),
+        ("unknown skipped", lambda: SkipBatch.decode(data)),
+        ("unknown preserved", lambda: PreserveBatch.decode(data)),
+        ("preserved forward", lambda: PreserveBatch.decode(data).encode()),
+    ):
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:<28} {elapsed * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
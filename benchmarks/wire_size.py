@@ -0,0 +1,92 @@
+"""Wire size of typical messages with and without omitted default fields.
+
+Usage: python benchmarks/wire_size.py [--messages 10000]
+"""
+import sys
+import random
+import timeit
+import argparse
+from typing import Type
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jce import JceField, JceStruct, types
+
+
+class Server(JceStruct):
+    server: types.STRING = JceField(jce_id=1)
+    port: types.INT32 = JceField(jce_id=2)
+    location: types.STRING = JceField("", jce_id=8)
+    weight: types.INT32 = JceField(0, jce_id=9)
+    flags: types.INT64 = JceField(0, jce_id=10)
+
+
+class Profile(JceStruct):
+    uin: types.INT64 = JceField(jce_id=0)
+    nick: types.STRING = JceField(jce_id=1)
+    remark: types.STRING = JceField("", jce_id=2)
+    gender: types.BYTE = JceField(bytes(1), jce_id=3)
+    age: types.INT16 = JceField(0, jce_id=4)
+    level: types.INT32 = JceField(0, jce_id=5)
+    vip: types.BOOL = JceField(False, jce_id=6)
+    signature: types.STRING = JceField("", jce_id=7)
+    face: types.BYTES = JceField(b"", jce_id=8)
+    tags: types.LIST[types.STRING] = JceField([], jce_id=9)
+    extra: types.MAP[types.STRING, types.STRING] = JceField({}, jce_id=10)
+    servers: types.LIST[Server] = JceField([], jce_id=11)
+
+
+class OmitServer(Server):
+    class Config:
+        jce_omit_default = True
+
+
+class OmitProfile(Profile):
+    servers: types.LIST[OmitServer] = JceField([], jce_id=11)
+
+    class Config:
+        jce_omit_default = True
+
+
+def messages(profile: Type[Profile], server: Type[Server], count: int):
+    rng = random.Random(0)
+    result = []
+    for i in range(count):
+        # most optional fields keep their defaults, as in real traffic
+        result.append(
+            profile(
+                uin=10000 + i,
+                nick=f"user{i}",
+                age=rng.choice([0, 0, 0, rng.randint(10, 60)]),
+                level=rng.choice([0, rng.randint(1, 64)]),
+                signature=rng.choice(["", "", "hello"]),
+                servers=[
+                    server(server="10.0.0.1", port=8080)
+                    for _ in range(rng.randint(0, 3))
+                ],
+            )
+        )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+
+    full = messages(Profile, Server, args.messages)
+    omitted = messages(OmitProfile, OmitServer, args.messages)
+    for name, values in (("all fields", full), ("omit_default", omitted)):
+        size = sum(len(value.encode()) for value in values)
+        elapsed = timeit.timeit(
+            lambda: [value.encode() for value in values], number=3
+        )
+        print(
+            f"{name:<14} {size / len(values):8.1f} bytes/message "
+            f"encode {elapsed / 3 / len(values) * 1e6:6.1f} us/message"
+        )
+
+
+if __name__ == "__main__":
+    main()
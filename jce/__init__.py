@@ -1,5 +1,52 @@
-from . import types as types
-from .types import JceField as JceField
-from .types import JceStruct as JceStruct
-from .types import JceDecoder as JceDecoder
-from .types import JceEncoder as JceEncoder
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from . import types as types
+    from .events import Event as Event
+    from .types import JceField as JceField
+    from .types import JceStruct as JceStruct
+    from .types import JceDecoder as JceDecoder
+    from .types import JceEncoder as JceEncoder
+    from .events import iter_events as iter_events
+    from .packet import RequestPacket as RequestPacket
+    from .stream import StreamEncoder as StreamEncoder
+
+__all__ = [
+    "types",
+    "JceField",
+    "JceStruct",
+    "JceDecoder",
+    "JceEncoder",
+    "Event",
+    "iter_events",
+    "RequestPacket",
+    "StreamEncoder",
+]
+
+# attribute name -> submodule, submodules are only imported on first access
+_lazy_attributes = {
+    "types": "types",
+    "JceField": "types",
+    "JceStruct": "types",
+    "JceDecoder": "types",
+    "JceEncoder": "types",
+    "Event": "events",
+    "iter_events": "events",
+    "RequestPacket": "packet",
+    "StreamEncoder": "stream",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _lazy_attributes.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{module_name}", __name__)
+    value = module if name == module_name else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,14 +1,426 @@
+import io
+import os
+import sys
+import json
+import time
+import base64
 import pprint
+import struct
 import argparse
+import importlib
+import itertools
+import multiprocessing
+from typing import IO, Any, List, Type, Tuple, Iterable, Iterator, Optional
 
-from jce import JceDecoder
+from jce import JceStruct, JceDecoder
+from jce.types import LAZY_MAP, COMPRESSED, LAZY_STRING
 
-parser = argparse.ArgumentParser(description="JceStruct command line tool")
-parser.add_argument(
-    "encoded", metavar="encoded", type=str, help="Encoded bytes in hex format"
-)
+INPUT_FORMATS = ("hex", "base64", "raw")
+FRAMINGS = ("line", "length", "concat")
+# bytes read from the input at once outside of line framing
+CHUNK_SIZE = 1 << 16
+# error of JceDecoder.skip_field for a field cut by the end of the data
+_TRUNCATED = "Unexpected end of data"
 
-args = parser.parse_args()
-result = JceDecoder.decode_bytes(bytes.fromhex(args.encoded))
+_struct: Optional[Type[JceStruct]] = None
+_text_format: Optional[str] = None
 
-pprint.pprint(result)
+
+def load_struct(path: str) -> Type[JceStruct]:
+    module_name, _, class_name = path.partition(":")
+    if not module_name or not class_name:
+        raise ValueError(f"Invalid struct path {path!r}, expect module:Class")
+    target: Any = importlib.import_module(module_name)
+    for name in class_name.split("."):
+        target = getattr(target, name)
+    if not isinstance(target, type) or not issubclass(target, JceStruct):
+        raise TypeError(f"{path!r} is not a JceStruct subclass")
+    return target
+
+
+def decode_text(text: bytes, format_: str) -> bytes:
+    if format_ == "hex":
+        return bytes.fromhex(text.decode("ascii"))
+    elif format_ == "base64":
+        return base64.b64decode(b"".join(text.split()), validate=True)
+    return text
+
+
+def split_concatenated(data: bytes) -> Iterator[bytes]:
+    return iter_concatenated((data,))
+
+
+def iter_concatenated(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    # JCE writes tags in ascending order, a record ends where they restart.
+    # A field cut by the end of a chunk is parsed again once its pending
+    # data doubled, which keeps large records linear. Other errors are
+    # raised right away.
+    buffer = bytearray()
+    offset = 0
+    last_id = -1
+    wait = 0
+    for chunk in itertools.chain(chunks, (None,)):
+        if chunk is not None:
+            buffer += chunk
+            if len(buffer) - offset < wait:
+                continue
+        start = 0
+        while offset < len(buffer):
+            try:
+                jce_id, type_, head_length = JceDecoder.decode_head(
+                    buffer, offset
+                )
+                end = JceDecoder.skip_field(buffer, type_, offset + head_length)
+            except (ValueError, struct.error) as e:
+                if chunk is None or (
+                    isinstance(e, ValueError) and str(e) != _TRUNCATED
+                ):
+                    raise
+                wait = 2 * (len(buffer) - offset)
+                break
+            if jce_id <= last_id:
+                yield bytes(buffer[start:offset])
+                start = offset
+            last_id = jce_id
+            offset = end
+            wait = 0
+        del buffer[:start]
+        offset -= start
+    if offset:
+        yield bytes(buffer)
+
+
+def _iter_decoded(
+    stream: IO[bytes], format_: str, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    # decode hex or base64 text chunk by chunk, the characters after the
+    # last complete byte or base64 quantum are kept for the next chunk
+    quantum = 2 if format_ == "hex" else 4
+    rest = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        text = rest + b"".join(chunk.split())
+        end = len(text) - len(text) % quantum
+        rest = text[end:]
+        if end:
+            yield decode_text(text[:end], format_)
+    if rest:
+        yield decode_text(rest, format_)
+
+
+class _ChunkReader(io.RawIOBase):
+    # file-like reader over an iterator of byte chunks
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._chunk = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._chunk:
+            self._chunk = next(self._chunks, b"")
+            if not self._chunk:
+                return 0
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+def _iter_chunks(
+    stream: IO[bytes], chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    return iter(lambda: stream.read(chunk_size), b"")
+
+
+def read_records(
+    stream: IO[bytes], format_: str, framing: str
+) -> Iterator[bytes]:
+    # line framed records are yielded undecoded, see _decode_record
+    if framing == "line":
+        if format_ == "raw":
+            raise ValueError("Line framing requires hex or base64 input")
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+        return
+
+    # other inputs are read and decoded in chunks, never as a whole
+    if format_ != "raw":
+        chunks = _iter_decoded(stream, format_)
+        if framing == "concat":
+            yield from iter_concatenated(chunks)
+            return
+        stream = io.BufferedReader(_ChunkReader(chunks), CHUNK_SIZE)
+    elif framing == "concat":
+        yield from iter_concatenated(_iter_chunks(stream))
+        return
+
+    while True:
+        prefix = stream.read(4)
+        if not prefix:
+            return
+        if len(prefix) < 4:
+            raise ValueError("Truncated length prefix")
+        length = int.from_bytes(prefix, "big")
+        record = stream.read(length)
+        if len(record) < length:
+            raise ValueError("Truncated record")
+        yield record
+
+
+def to_jsonable(value: Any) -> Any:
+    if isinstance(value, JceStruct):
+        value = value.dict()
+    elif isinstance(value, LAZY_MAP):
+        value = dict(value.items())
+    elif isinstance(value, COMPRESSED):
+        value = value.value.dict()
+    if isinstance(value, dict):
+        return {
+            (
+                base64.b64encode(key).decode()
+                if isinstance(key, bytes)
+                else key
+            ): to_jsonable(item)
+            for key, item in value.items()
+        }
+    elif isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    elif isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    elif isinstance(value, LAZY_STRING):
+        return value.value
+    return value
+
+
+def decode(data: bytes, struct: Optional[Type[JceStruct]] = None) -> Any:
+    if struct is None:
+        return JceDecoder.decode_bytes(data)
+    return struct.decode(data)
+
+
+def _init_worker(struct_path: Optional[str], text_format: Optional[str]):
+    global _struct, _text_format
+    _struct = load_struct(struct_path) if struct_path else None
+    _text_format = text_format
+
+
+def _decode_record(item: Tuple[int, bytes]) -> Tuple[bool, str]:
+    index, data = item
+    try:
+        if _text_format is not None:
+            data = decode_text(data, _text_format)
+        result = to_jsonable(decode(data, _struct))
+        return True, json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        error = {"index": index, "error": f"{type(e).__name__}: {e}"}
+        return False, json.dumps(error, ensure_ascii=False)
+
+
+def iter_inputs(paths: List[str]) -> Iterator[IO[bytes]]:
+    for path in paths:
+        if path == "-":
+            yield sys.stdin.buffer
+            continue
+        with open(path, "rb") as f:
+            yield f
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    framing = args.framing or ("length" if args.format == "raw" else "line")
+    text_format = args.format if framing == "line" else None
+    records: Iterable[bytes] = (
+        record
+        for stream in iter_inputs(args.input or ["-"])
+        for record in read_records(stream, args.format, framing)
+    )
+
+    count = errors = total_bytes = 0
+
+    def indexed() -> Iterator[Tuple[int, bytes]]:
+        nonlocal total_bytes
+        for index, record in enumerate(records):
+            total_bytes += len(record)
+            yield index, record
+
+    output = (
+        open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    )
+    start = time.perf_counter()
+    try:
+        if args.workers > 1:
+            with multiprocessing.Pool(
+                args.workers, _init_worker, (args.struct, text_format)
+            ) as pool:
+                results = pool.imap(
+                    _decode_record, indexed(), chunksize=args.chunksize
+                )
+                for ok, line in results:
+                    count += 1
+                    errors += not ok
+                    output.write(line + "\n")
+        else:
+            _init_worker(args.struct, text_format)
+            for ok, line in map(_decode_record, indexed()):
+                count += 1
+                errors += not ok
+                output.write(line + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    if args.stats:
+        elapsed = max(elapsed, 1e-9)
+        print(
+            f"{count} records ({errors} errors), {total_bytes} bytes "
+            f"in {elapsed:.3f}s: {count / elapsed:.0f} records/s, "
+            f"{total_bytes / elapsed / 1e6:.2f} MB/s",
+            file=sys.stderr,
+        )
+
+
+def add_input_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "-i",
+        "--input",
+        action="append",
+        metavar="FILE",
+        help="Input file, '-' for stdin (default), can be repeated",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=INPUT_FORMATS,
+        default="hex",
+        help="Input encoding (default hex)",
+    )
+    parser.add_argument(
+        "--framing",
+        choices=FRAMINGS,
+        help=(
+            "Record framing: one record per line, 4-byte big-endian length "
+            "prefix, or concatenated records split at tag restarts "
+            "(default line, length for raw input)"
+        ),
+    )
+    parser.add_argument(
+        "-s",
+        "--struct",
+        metavar="MODULE:CLASS",
+        help="Decode records as the given JceStruct class",
+    )
+
+
+def analyze_main(argv: List[str]) -> None:
+    from jce.analyze import analyze
+
+    parser = argparse.ArgumentParser(
+        prog="python -m jce analyze",
+        description="Report the encoded bytes per tag path",
+    )
+    parser.add_argument(
+        "encoded",
+        metavar="encoded",
+        type=str,
+        nargs="?",
+        help="Encoded bytes in hex format, read records if omitted",
+    )
+    add_input_arguments(parser)
+    parser.add_argument(
+        "-n", "--limit", type=int, help="Show the largest paths only"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Write the report as JSON"
+    )
+
+    args = parser.parse_args(argv)
+    try:
+        struct = load_struct(args.struct) if args.struct else None
+    except (ImportError, AttributeError, ValueError, TypeError) as e:
+        parser.error(str(e))
+
+    framing = args.framing or ("length" if args.format == "raw" else "line")
+    records: Iterable[bytes]
+    if args.encoded is not None:
+        records = [bytes.fromhex(args.encoded)]
+    else:
+        records = (
+            decode_text(record, args.format) if framing == "line" else record
+            for stream in iter_inputs(args.input or ["-"])
+            for record in read_records(stream, args.format, framing)
+        )
+    try:
+        report = analyze(records, struct)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False))
+    else:
+        print(report.format(args.limit))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "analyze":
+        analyze_main(argv[1:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="JceStruct command line tool",
+        epilog="Run 'python -m jce analyze -h' for the size analyzer.",
+    )
+    parser.add_argument(
+        "encoded",
+        metavar="encoded",
+        type=str,
+        nargs="?",
+        help="Encoded bytes in hex format, batch mode if omitted",
+    )
+    add_input_arguments(parser)
+    parser.add_argument(
+        "-o", "--output", metavar="FILE", help="Output file (default stdout)"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="Decode processes"
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=256,
+        help="Records sent to a worker at once (default 256)",
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="Report throughput to stderr"
+    )
+
+    args = parser.parse_args(argv)
+    try:
+        struct = load_struct(args.struct) if args.struct else None
+    except (ImportError, AttributeError, ValueError, TypeError) as e:
+        parser.error(str(e))
+
+    if args.encoded is not None:
+        pprint.pprint(decode(bytes.fromhex(args.encoded), struct))
+        return
+
+    try:
+        run_batch(args)
+    except ValueError as e:
+        parser.error(str(e))
+    except BrokenPipeError:
+        # output closed early (e.g. piped into head), silence the final flush
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
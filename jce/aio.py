@@ -0,0 +1,137 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Type, TypeVar, Optional, Generator
+
+from .types import (
+    MAP,
+    LIST,
+    _UNKNOWN,
+    JceStruct,
+    JceDecoder,
+    JceModelField,
+    _set_unknown,
+    _iter_encoded,
+    _struct_schema,
+    resolve_jce_type,
+)
+
+S = TypeVar("S", bound=JceStruct)
+
+
+async def _drive(steps: Generator[None, None, Any]) -> Any:
+    try:
+        while True:
+            next(steps)
+            await asyncio.sleep(0)
+    except StopIteration as stop:
+        return stop.value
+
+
+def _item_struct(field: JceModelField) -> Optional[Type[JceStruct]]:
+    # struct class of the items of a LIST[Struct] or MAP[K, Struct] field
+    if field.pre_validate:
+        return None
+    if issubclass(field.jce_type, LIST) and len(field.jce_args) == 1:
+        item_type, _ = resolve_jce_type(field.jce_args[0])
+    elif issubclass(field.jce_type, MAP) and len(field.jce_args) == 2:
+        item_type, _ = resolve_jce_type(field.jce_args[1])
+    else:
+        return None
+    if item_type is not None and issubclass(item_type, JceStruct):
+        return item_type
+    return None
+
+
+async def _validate_items(
+    jce_struct: Type[JceStruct], jce_dict: Dict[int, Any], chunk_size: int
+) -> None:
+    # Validate the structs inside top level containers in chunks, the field
+    # keeps the instances as they are. Failures are left to the field
+    # validation, so errors are the same as with decode.
+    for field in jce_struct.__jce_fields__.values():
+        item_struct = _item_struct(field)
+        value = jce_dict.get(field.jce_id)
+        if item_struct is None:
+            continue
+        elif isinstance(value, list):
+            keys: Any = range(len(value))
+        elif isinstance(value, dict):
+            keys = list(value)
+        else:
+            continue
+        for count, key in enumerate(keys, 1):
+            try:
+                value[key] = item_struct.validate(value[key])
+            except Exception:
+                break
+            if count % chunk_size == 0:
+                await asyncio.sleep(0)
+
+
+async def decode_async(
+    jce_struct: Type[S],
+    data: bytes,
+    extra: Dict[str, Any],
+    chunk_size: int,
+    executor_threshold: Optional[int],
+    executor: Optional[Executor],
+) -> S:
+    if executor_threshold is not None and len(data) >= executor_threshold:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, functools.partial(jce_struct.decode, data, **extra)
+        )
+
+    decoder = jce_struct.__jce_decoder__
+    if (
+        jce_struct.decode.__func__ is not JceStruct.decode.__func__
+        or decoder.decode.__func__ is not JceDecoder.decode.__func__
+        or not decoder._uses_stack()
+    ):
+        # customized decoding can't be split
+        return jce_struct.decode(data, **extra)
+
+    steps = decoder._decode_steps(
+        data,
+        jce_struct.__jce_default_type__,
+        extra,
+        False,
+        chunk_size,
+        _struct_schema(jce_struct),
+    )
+    jce_dict = await _drive(steps)
+    unknown = jce_dict.pop(_UNKNOWN, None)
+    await _validate_items(jce_struct, jce_dict, chunk_size)
+    result = decoder.from_jce_dict(
+        jce_struct, jce_struct.__jce_fields__, jce_dict, **extra
+    )
+    if unknown:
+        _set_unknown(result, unknown)
+    return result
+
+
+async def encode_async(
+    value: JceStruct,
+    chunk_size: int,
+    executor_threshold: Optional[int],
+    executor: Optional[Executor],
+) -> bytes:
+    fields = value.__jce_fields__
+    if executor_threshold is not None:
+        # number of items in the top level containers
+        size = sum(
+            len(item)
+            for item in (value[name] for name in fields)
+            if isinstance(item, (list, dict))
+        )
+        if size >= executor_threshold:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, value.encode)
+
+    pieces: List[bytes] = []
+    for count, piece in enumerate(_iter_encoded(value), 1):
+        pieces.append(piece)
+        if count % chunk_size == 0:
+            await asyncio.sleep(0)
+    return b"".join(pieces)
@@ -0,0 +1,285 @@
+import struct
+from typing import Any, Dict, List, Type, Tuple, Union, Iterable, Optional
+
+from .types import (
+    MAP,
+    LIST,
+    LAZY_MAP,
+    _FIXED_SIZE,
+    JceStruct,
+    JceDecoder,
+    resolve_jce_type,
+)
+
+# wire type names, containers and strings by their head type
+_TYPE_NAMES = {
+    0: "BYTE",
+    1: "INT16",
+    2: "INT32",
+    3: "INT64",
+    4: "FLOAT",
+    5: "DOUBLE",
+    6: "STRING1",
+    7: "STRING4",
+    8: "MAP",
+    9: "LIST",
+    10: "STRUCT",
+    12: "ZERO_TAG",
+    13: "BYTES",
+}
+
+_STRUCT, _LIST, _MAP = 10, 9, 8
+
+
+class PathSize:
+    __slots__ = ("count", "records", "head_bytes", "body_bytes", "types")
+
+    def __init__(self):
+        # values at the path, and records holding at least one
+        self.count = 0
+        self.records = 0
+        # heads of the values, the rest including nested values
+        self.head_bytes = 0
+        self.body_bytes = 0
+        # wire type name -> total bytes
+        self.types: Dict[str, int] = {}
+
+    @property
+    def total_bytes(self) -> int:
+        return self.head_bytes + self.body_bytes
+
+    def merge(self, other: "PathSize") -> None:
+        self.count += other.count
+        self.records += other.records
+        self.head_bytes += other.head_bytes
+        self.body_bytes += other.body_bytes
+        for name, size in other.types.items():
+            self.types[name] = self.types.get(name, 0) + size
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "records": self.records,
+            "head_bytes": self.head_bytes,
+            "body_bytes": self.body_bytes,
+            "types": dict(self.types),
+        }
+
+
+class SizeReport:
+    # Bytes per tag path over one or more records, found by scanning the
+    # heads. Paths are tag numbers or, with a struct, field names joined
+    # by ".", list items add "[]", map keys and values "{key}" and
+    # "{value}". Container sizes include their nested values.
+
+    def __init__(
+        self,
+        jce_struct: Optional[Type[JceStruct]] = None,
+        decoder: Type[JceDecoder] = JceDecoder,
+    ):
+        self.jce_struct = jce_struct
+        self.decoder = decoder
+        self.records = 0
+        self.total_bytes = 0
+        self.paths: Dict[str, PathSize] = {}
+
+    def add(self, data: bytes) -> None:
+        # the record is tallied apart, a failed add leaves the report as is
+        paths: Dict[str, PathSize] = {}
+        try:
+            self._scan(data, paths)
+        except (struct.error, IndexError):
+            raise ValueError("Unexpected end of data") from None
+        for path, tally in paths.items():
+            entry = self.paths.get(path)
+            if entry is None:
+                self.paths[path] = tally
+            else:
+                entry.merge(tally)
+        self.records += 1
+        self.total_bytes += len(data)
+
+    def _scan(self, data: bytes, paths: Dict[str, PathSize]) -> None:
+        decode_head = self.decoder.decode_head
+        decode_int = self.decoder.decode_int
+        max_depth = self.decoder.max_depth
+        length = len(data)
+
+        # open containers: [kind, remaining items or -1 for structs, path,
+        # declared item types or struct class, start offset, head length]
+        stack: List[List[Any]] = []
+        offset = 0
+        while True:
+            while stack and stack[-1][0] != _STRUCT and stack[-1][1] == 0:
+                self._close(stack.pop(), offset, paths)
+            if offset >= length:
+                if stack:
+                    raise ValueError("Unexpected end of data")
+                break
+
+            start = offset
+            jce_id, type_, head_length = decode_head(data, offset)
+            offset += head_length
+            if stack:
+                top = stack[-1]
+                kind, prefix, context = top[0], top[2], top[3]
+            else:
+                kind, prefix, context = _STRUCT, "", self.jce_struct
+
+            if type_ == 11:
+                if not stack or kind != _STRUCT:
+                    raise ValueError("Unexpected struct end")
+                self._close(stack.pop(), offset, paths)
+                continue
+            # path and declared type of this value
+            elif kind == _LIST:
+                path, child = prefix + "[]", context
+                top[1] -= 1
+            elif kind == _MAP:
+                is_key = top[1] % 2 == 0
+                path = prefix + ("{key}" if is_key else "{value}")
+                child = context[0 if is_key else 1] if context else None
+                top[1] -= 1
+            else:
+                name, child = self._field(context, jce_id)
+                path = f"{prefix}.{name}" if prefix else name
+
+            if type_ in _FIXED_SIZE:
+                offset += _FIXED_SIZE[type_]
+            elif type_ == 6:
+                offset += 1 + data[offset]
+            elif type_ == 7:
+                offset += 4 + struct.unpack_from(">I", data, offset)[0]
+            elif type_ == 13:
+                size, offset = decode_int(data, offset + 1)
+                offset += size
+            elif type_ in (_STRUCT, _LIST, _MAP):
+                if len(stack) >= max_depth:
+                    raise ValueError(f"Max nesting depth {max_depth} exceeded")
+                if type_ == _STRUCT:
+                    remaining = -1
+                    context = child[0] if _is_struct(child) else None
+                else:
+                    count, offset = decode_int(data, offset)
+                    remaining = count * 2 if type_ == _MAP else count
+                    context = self._items(child, type_)
+                stack.append(
+                    [type_, remaining, path, context, start, head_length]
+                )
+                continue
+            else:
+                raise ValueError(f"Unknown JceType for id {type_}")
+            if offset > length:
+                raise ValueError("Unexpected end of data")
+            self._count(path, type_, head_length, offset - start, paths)
+
+    def _close(
+        self, entry: List[Any], offset: int, paths: Dict[str, PathSize]
+    ) -> None:
+        type_, _, path, _, start, head_length = entry
+        self._count(path, type_, head_length, offset - start, paths)
+
+    @staticmethod
+    def _count(
+        path: str,
+        type_: int,
+        head_length: int,
+        size: int,
+        paths: Dict[str, PathSize],
+    ) -> None:
+        # paths of one record, each counts the record once
+        entry = paths.get(path)
+        if entry is None:
+            entry = paths[path] = PathSize()
+            entry.records = 1
+        entry.count += 1
+        entry.head_bytes += head_length
+        entry.body_bytes += size - head_length
+        name = _TYPE_NAMES[type_]
+        entry.types[name] = entry.types.get(name, 0) + size
+
+    @staticmethod
+    def _field(context: Any, jce_id: int) -> Tuple[str, Any]:
+        # field name and annotation of a tag of the struct context
+        if context is not None:
+            for name, field in context.__jce_fields__.items():
+                if field.jce_id == jce_id:
+                    return name, (field.jce_type, field.jce_args)
+        return str(jce_id), None
+
+    @staticmethod
+    def _items(child: Any, type_: int) -> Any:
+        # annotation of the items, (key, value) for maps
+        if child is None or child[0] is None:
+            return None
+        jce_type, jce_args = child
+        if type_ == _LIST and issubclass(jce_type, LIST) and len(jce_args) == 1:
+            return resolve_jce_type(jce_args[0])
+        elif (
+            type_ == _MAP
+            and issubclass(jce_type, (MAP, LAZY_MAP))
+            and len(jce_args) == 2
+        ):
+            return (
+                resolve_jce_type(jce_args[0]),
+                resolve_jce_type(jce_args[1]),
+            )
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "total_bytes": self.total_bytes,
+            "paths": {
+                path: entry.to_dict() for path, entry in self.paths.items()
+            },
+        }
+
+    def format(self, limit: Optional[int] = None) -> str:
+        # table of the paths by total bytes
+        rows = sorted(
+            self.paths.items(), key=lambda item: -item[1].total_bytes
+        )[:limit]
+        total = max(self.total_bytes, 1)
+        records = max(self.records, 1)
+        width = max([len(path) for path, _ in rows] + [4])
+        lines = [
+            f"{self.records} records, {self.total_bytes} bytes",
+            f"{'path':<{width}} {'bytes':>10} {'share':>7} {'head':>8} "
+            f"{'records':>8} {'count':>8}  types",
+        ]
+        for path, entry in rows:
+            types = ", ".join(
+                f"{name} {size}"
+                for name, size in sorted(
+                    entry.types.items(), key=lambda item: -item[1]
+                )
+            )
+            lines.append(
+                f"{path:<{width}} {entry.total_bytes:>10} "
+                f"{entry.total_bytes / total:>7.1%} {entry.head_bytes:>8} "
+                f"{entry.records / records:>8.1%} {entry.count:>8}  {types}"
+            )
+        return "\n".join(lines)
+
+
+def _is_struct(child: Any) -> bool:
+    return (
+        child is not None
+        and isinstance(child[0], type)
+        and issubclass(child[0], JceStruct)
+    )
+
+
+def analyze(
+    records: Union[bytes, Iterable[bytes]],
+    jce_struct: Optional[Type[JceStruct]] = None,
+    decoder: Type[JceDecoder] = JceDecoder,
+) -> SizeReport:
+    # one payload or an iterable of them
+    report = SizeReport(jce_struct, decoder)
+    if isinstance(records, (bytes, bytearray, memoryview)):
+        records = (records,)
+    for data in records:
+        report.add(data)
+    return report
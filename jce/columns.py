@@ -0,0 +1,214 @@
+from typing import Any, Dict, List, Type, Tuple, Iterable, Optional
+
+from .types import (
+    INT,
+    BOOL,
+    BYTE,
+    _ZERO,
+    BYTES,
+    FLOAT,
+    _BYTES,
+    _FIXED,
+    DOUBLE,
+    STRING,
+    _STRING,
+    JceType,
+    JceStruct,
+    JceModelField,
+    _decode_plan,
+    _native_value,
+)
+
+# head types whose plain value already has the python type of the field
+_NATIVE_HEADS: Tuple[Tuple[Type[JceType], Tuple[int, ...]], ...] = (
+    (BOOL, ()),
+    (BYTE, (0,)),
+    (INT, (1, 2, 3)),
+    (FLOAT, (4,)),
+    (DOUBLE, (5,)),
+    (STRING, (6, 7)),
+    (BYTES, (13,)),
+)
+
+# numpy dtype and fill value of numeric columns
+_NUMPY_TYPES: Tuple[Tuple[Type[JceType], str, Any], ...] = (
+    (BOOL, "bool", False),
+    (INT, "int64", 0),
+    (FLOAT, "float64", 0.0),
+    (DOUBLE, "float64", 0.0),
+)
+
+_MISSING = object()
+
+
+def _converter(field: JceModelField, type_: int) -> Any:
+    # None if values of this head type need no conversion for the field
+    for jce_type, heads in _NATIVE_HEADS:
+        if issubclass(field.jce_type, jce_type):
+            if type_ in heads:
+                return None
+            break
+    jce_type, jce_args = field.jce_type, field.jce_args
+    return lambda value: _native_value(value, jce_type, jce_args)
+
+
+def decode_columns(
+    jce_struct: Type[JceStruct], payloads: Iterable[bytes], numpy: bool
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Records of one struct usually repeat the same heads, so everything
+    # needed to decode a field is cached by its head byte: the column, how
+    # to read the value and how to convert it. Scalars are read inline,
+    # other values are sliced out with skip_field and decoded on their own.
+    decoder = jce_struct.__jce_decoder__
+    default_types = jce_struct.__jce_default_type__
+    fields = jce_struct.__jce_fields__
+    names = list(fields)
+    columns: List[List[Any]] = [[] for _ in names]
+    missing: List[List[bool]] = [[] for _ in names]
+    index = {field.jce_id: i for i, field in enumerate(fields.values())}
+    plan = _decode_plan(default_types, False)
+    decode_head = decoder.decode_head
+    decode_int = decoder.decode_int
+    skip_field = decoder.skip_field
+    # head byte -> (column or -1, kind, unpacker, converter)
+    heads: Dict[int, Tuple[int, int, Any, Any]] = {}
+    generic = not decoder._uses_stack()
+
+    for payload in payloads:
+        row: List[Any] = [_MISSING] * len(names)
+        if generic:
+            # customized decoders are used as they are
+            jce_dict = decoder._decode_raw(payload, default_types, {})
+            for jce_id, value in jce_dict.items():
+                column = index.get(jce_id)
+                if column is not None:
+                    field = fields[names[column]]
+                    row[column] = _native_value(
+                        value, field.jce_type, field.jce_args
+                    )
+        else:
+            _decode_row(
+                payload,
+                row,
+                heads,
+                plan,
+                default_types,
+                index,
+                fields,
+                names,
+                decoder,
+                decode_head,
+                decode_int,
+                skip_field,
+            )
+        for column, value in enumerate(row):
+            if value is _MISSING:
+                columns[column].append(None)
+                missing[column].append(True)
+            else:
+                columns[column].append(value)
+                missing[column].append(False)
+
+    if numpy:
+        return _to_numpy(jce_struct, names, columns, missing)
+    return dict(zip(names, columns)), dict(zip(names, missing))
+
+
+def _decode_row(
+    payload: bytes,
+    row: List[Any],
+    heads: Dict[int, Tuple[int, int, Any, Any]],
+    plan: Dict[int, Tuple[int, Any, Any, Type[JceType]]],
+    default_types: Any,
+    index: Dict[int, int],
+    fields: Dict[str, JceModelField],
+    names: List[str],
+    decoder: Any,
+    decode_head: Any,
+    decode_int: Any,
+    skip_field: Any,
+) -> None:
+    offset = 0
+    length = len(payload)
+    while offset < length:
+        head = payload[offset]
+        handler = heads.get(head)
+        if handler is None:
+            jce_id, type_, head_length = decode_head(payload, offset)
+            entry = plan.get(type_)
+            if entry is None:
+                raise ValueError(f"Unknown JceType for id {type_}")
+            column = index.get(jce_id, -1)
+            converter = (
+                None if column < 0 else _converter(fields[names[column]], type_)
+            )
+            handler = (column, entry[0], entry[1], converter)
+            if head_length == 1:
+                # a tag of 15 and above takes a second byte, not cached
+                heads[head] = handler
+        else:
+            head_length = 1
+        column, kind, unpacker, converter = handler
+
+        start = offset
+        offset += head_length
+        if column < 0:
+            offset = skip_field(payload, head & 0xF, offset)
+            continue
+        elif kind == _FIXED:
+            value = unpacker.unpack_from(payload, offset)[0]
+            offset += unpacker.size
+        elif kind == _STRING:
+            size = unpacker.unpack_from(payload, offset)[0]
+            offset += unpacker.size
+            value = str(payload[offset : offset + size], "utf-8")
+            offset += size
+        elif kind == _BYTES:
+            size, offset = decode_int(payload, offset + 1)
+            value = payload[offset : offset + size]
+            offset += size
+        elif kind == _ZERO:
+            value = bytes(1)
+        else:
+            # containers, structs and custom types
+            offset = skip_field(payload, head & 0xF, offset)
+            jce_dict = decoder._decode_raw(
+                payload[start:offset], default_types, {}
+            )
+            value = next(iter(jce_dict.values()))
+        if offset > length:
+            raise ValueError("Unexpected end of data")
+        row[column] = value if converter is None else converter(value)
+
+
+def _to_numpy(
+    jce_struct: Type[JceStruct],
+    names: List[str],
+    columns: List[List[Any]],
+    missing: List[List[bool]],
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy columns require the numpy package") from None
+
+    fields = jce_struct.__jce_fields__
+    result: Dict[str, Any] = {}
+    masks: Dict[str, Any] = {}
+    for name, column, mask in zip(names, columns, missing):
+        dtype: Optional[str] = None
+        for jce_type, numpy_type, fill in _NUMPY_TYPES:
+            if issubclass(fields[name].jce_type, jce_type):
+                dtype = numpy_type
+                break
+        if dtype is None:
+            array = numpy.empty(len(column), dtype=object)
+            array[:] = column
+        else:
+            array = numpy.array(
+                [fill if value is None else value for value in column],
+                dtype=dtype,
+            )
+        result[name] = array
+        masks[name] = numpy.array(mask, dtype=bool)
+    return result, masks
@@ -0,0 +1,120 @@
+import enum
+from typing import Any, List, Type, Tuple, Mapping, Iterator, Optional
+
+from .types import (
+    _END,
+    _MAP,
+    _LIST,
+    _ZERO,
+    _BYTES,
+    _FIXED,
+    _CUSTOM,
+    _STRING,
+    _STRUCT,
+    JceType,
+    JceStruct,
+    JceDecoder,
+    _decode_plan,
+)
+
+
+class Event(enum.IntEnum):
+    FIELD = 0
+    VALUE = 1
+    STRUCT_START = 2
+    STRUCT_END = 3
+    LIST_START = 4
+    LIST_END = 5
+    MAP_START = 6
+    MAP_END = 7
+
+
+_STRUCT_START_EVENT = (Event.STRUCT_START,)
+_STRUCT_END_EVENT = (Event.STRUCT_END,)
+_LIST_END_EVENT = (Event.LIST_END,)
+_MAP_END_EVENT = (Event.MAP_END,)
+
+
+def iter_events(
+    data: bytes,
+    default_types: Optional[Mapping[int, Type[JceType]]] = None,
+    decoder: Type[JceDecoder] = JceDecoder,
+) -> Iterator[Tuple[Any, ...]]:
+    # Every head yields (FIELD, jce_id, type, offset), followed by either
+    # (VALUE, value) with the plain python value, (STRUCT_START,),
+    # (LIST_START, count) or (MAP_START, count). Containers are closed by
+    # (STRUCT_END,), (LIST_END,) and (MAP_END,), map items alternate
+    # between key and value fields. Nothing is validated or wrapped.
+    plan = _decode_plan(default_types or JceStruct.__jce_default_type__)
+    decode_head = decoder.decode_head
+    decode_int = decoder.decode_int
+    max_depth = decoder.max_depth
+    length = len(data)
+
+    # [kind, remaining items] of open containers, -1 items for structs
+    stack: List[List[int]] = []
+    offset = 0
+    while True:
+        while stack and stack[-1][1] == 0:
+            kind = stack.pop()[0]
+            yield _LIST_END_EVENT if kind == _LIST else _MAP_END_EVENT
+
+        if offset >= length:
+            if stack:
+                raise ValueError("Unexpected end of data")
+            return
+
+        jce_id, type_, head_length = decode_head(data, offset)
+        entry = plan.get(type_)
+        if entry is None:
+            raise ValueError(f"Unknown JceType for id {type_}")
+        kind, unpacker, _, jce_type = entry
+
+        if stack:
+            container = stack[-1]
+            if container[1] > 0:
+                container[1] -= 1
+            elif kind == _END:
+                offset += head_length
+                stack.pop()
+                yield _STRUCT_END_EVENT
+                continue
+
+        yield Event.FIELD, jce_id, type_, offset
+        offset += head_length
+
+        if kind == _FIXED:
+            yield Event.VALUE, unpacker.unpack_from(data, offset)[0]
+            offset += unpacker.size
+        elif kind == _STRING:
+            size = unpacker.unpack_from(data, offset)[0]
+            offset += unpacker.size
+            yield Event.VALUE, str(data[offset : offset + size], "utf-8")
+            offset += size
+        elif kind == _BYTES:
+            size, offset = decode_int(data, offset + 1)
+            yield Event.VALUE, data[offset : offset + size]
+            offset += size
+        elif kind == _ZERO:
+            yield Event.VALUE, bytes(1)
+        elif kind == _END:
+            yield Event.VALUE, None
+        elif kind == _CUSTOM:
+            value, data_length = jce_type.from_bytes(data[offset:])
+            offset += data_length
+            yield Event.VALUE, value
+        else:
+            if len(stack) >= max_depth:
+                raise ValueError(f"Max nesting depth {max_depth} exceeded")
+            if kind == _STRUCT:
+                stack.append([_STRUCT, -1])
+                yield _STRUCT_START_EVENT
+                continue
+            count, offset = decode_int(data, offset)
+            count = max(count, 0)
+            if kind == _LIST:
+                stack.append([_LIST, count])
+                yield Event.LIST_START, count
+            else:
+                stack.append([_MAP, count * 2])
+                yield Event.MAP_START, count
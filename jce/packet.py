@@ -0,0 +1,326 @@
+import struct
+from typing import (
+    Any,
+    Dict,
+    List,
+    Type,
+    Tuple,
+    Union,
+    TypeVar,
+    Callable,
+    Optional,
+)
+
+from .types import INT, STRING, JceType, JceStruct, JceDecoder
+
+S = TypeVar("S", bound=JceStruct)
+
+Buffer = Union[bytes, bytearray, memoryview]
+# BYTES value kept as the pieces it is assembled from, never joined on decode
+Payload = Tuple[Buffer, ...]
+
+_STRUCT_START = JceType.head_byte(0, 10)
+_STRUCT_END = JceType.head_byte(0, 11)
+
+_INT, _STRING, _BYTES, _MAP = 0, 1, 2, 3
+_HEAD_KIND = {0: _INT, 1: _INT, 2: _INT, 3: _INT, 12: _INT}
+_HEAD_KIND.update({6: _STRING, 7: _STRING, 8: _MAP, 13: _BYTES})
+
+# jce_id -> (attribute, kind) of the RequestPacket header
+_FIELDS = {
+    1: ("version", _INT),
+    2: ("packet_type", _INT),
+    3: ("message_type", _INT),
+    4: ("request_id", _INT),
+    5: ("servant_name", _STRING),
+    6: ("func_name", _STRING),
+    8: ("timeout", _INT),
+    9: ("context", _MAP),
+    10: ("status", _MAP),
+}
+
+
+def _read_string(
+    view: memoryview, offset: int, decoder: Type[JceDecoder]
+) -> Tuple[str, int]:
+    _, type_, head_length = decoder.decode_head(view, offset)
+    offset += head_length
+    if type_ == 6:
+        size = view[offset]
+        offset += 1
+    elif type_ == 7:
+        size = struct.unpack_from(">I", view, offset)[0]
+        offset += 4
+    else:
+        raise TypeError(f"Invalid string head type: {type_}")
+    end = offset + size
+    if end > len(view):
+        raise ValueError("Unexpected end of data")
+    return str(view[offset:end], "utf-8"), end
+
+
+def _read_bytes(
+    view: memoryview, offset: int, decoder: Type[JceDecoder]
+) -> Tuple[memoryview, int]:
+    _, type_, head_length = decoder.decode_head(view, offset)
+    if type_ != 13:
+        raise TypeError(f"Invalid bytes head type: {type_}")
+    size, offset = decoder.decode_int(view, offset + head_length + 1)
+    end = offset + size
+    if end > len(view):
+        raise ValueError("Unexpected end of data")
+    return view[offset:end], end
+
+
+def _read_map(
+    view: memoryview,
+    offset: int,
+    decoder: Type[JceDecoder],
+    read_value: Callable[..., Tuple[Any, int]],
+) -> Tuple[Dict[str, Any], int]:
+    _, type_, head_length = decoder.decode_head(view, offset)
+    if type_ != 8:
+        raise TypeError(f"Invalid map head type: {type_}")
+    count, offset = decoder.decode_int(view, offset + head_length)
+    result = {}
+    for _ in range(count):
+        key, offset = _read_string(view, offset, decoder)
+        result[key], offset = read_value(view, offset, decoder)
+    return result, offset
+
+
+def _read_payload(
+    view: memoryview, offset: int, decoder: Type[JceDecoder]
+) -> Tuple[Payload, int]:
+    value, offset = _read_bytes(view, offset, decoder)
+    return (value,), offset
+
+
+def _read_payload_map(
+    view: memoryview, offset: int, decoder: Type[JceDecoder]
+) -> Tuple[Dict[str, Payload], int]:
+    return _read_map(view, offset, decoder, _read_payload)
+
+
+def _write_payload(pieces: List[Buffer], jce_id: int, payload: Payload):
+    pieces.append(
+        JceType.head_byte(jce_id, 13)
+        + JceType.head_byte(0, 0)
+        + INT.to_bytes(0, sum(len(piece) for piece in payload))
+    )
+    pieces.extend(payload)
+
+
+def _write_string_map(jce_id: int, value: Dict[str, str]) -> bytes:
+    byte = JceType.head_byte(jce_id, 8) + INT.to_bytes(0, len(value))
+    for k, v in value.items():
+        byte += STRING.to_bytes(0, k) + STRING.to_bytes(1, v)
+    return byte
+
+
+class RequestPacket:
+    # The standard request envelope. Only the header is decoded, sBuffer
+    # is kept as a view of the input and split into the UniPacket values
+    # (name -> BYTES in version 3, name -> type name -> BYTES in version 2)
+    # on first use. Values are views as well until they are decoded.
+    # Reading a packet from several threads is safe, put() is not.
+    __jce_decoder__: Type[JceDecoder] = JceDecoder
+
+    __slots__ = (
+        "version",
+        "packet_type",
+        "message_type",
+        "request_id",
+        "servant_name",
+        "func_name",
+        "timeout",
+        "context",
+        "status",
+        "_buffer",
+        "_data",
+    )
+
+    def __init__(
+        self,
+        servant_name: str = "",
+        func_name: str = "",
+        *,
+        version: int = 3,
+        packet_type: int = 0,
+        message_type: int = 0,
+        request_id: int = 0,
+        timeout: int = 0,
+        context: Optional[Dict[str, str]] = None,
+        status: Optional[Dict[str, str]] = None,
+        buffer: Buffer = b"",
+    ):
+        self.version = version
+        self.packet_type = packet_type
+        self.message_type = message_type
+        self.request_id = request_id
+        self.servant_name = servant_name
+        self.func_name = func_name
+        self.timeout = timeout
+        self.context = {} if context is None else context
+        self.status = {} if status is None else status
+        self.buffer = buffer
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(servant_name={self.servant_name!r}, "
+            f"func_name={self.func_name!r}, version={self.version}, "
+            f"request_id={self.request_id}, names={self.names()!r})"
+        )
+
+    @property
+    def buffer(self) -> memoryview:
+        if self._buffer is None:
+            self._buffer = memoryview(b"".join(self._buffer_pieces()))
+        return self._buffer
+
+    @buffer.setter
+    def buffer(self, value: Buffer) -> None:
+        self._buffer: Optional[memoryview] = memoryview(value)
+        self._data: Optional[Dict[str, Any]] = None
+
+    def _items(self) -> Dict[str, Any]:
+        if self._data is None:
+            if not self._buffer:
+                self._data = {}
+            else:
+                read_value = (
+                    _read_payload_map if self.version == 2 else _read_payload
+                )
+                self._data, _ = _read_map(
+                    self._buffer, 0, self.__jce_decoder__, read_value
+                )
+        return self._data
+
+    def _payload(self, name: str, type_name: Optional[str]) -> Payload:
+        value = self._items()[name]
+        if self.version != 2:
+            return value
+        elif type_name is None:
+            return next(iter(value.values()))
+        return value[type_name]
+
+    def _buffer_pieces(self) -> List[Buffer]:
+        data = self._items()
+        pieces: List[Buffer] = [
+            JceType.head_byte(0, 8) + INT.to_bytes(0, len(data))
+        ]
+        for name, value in data.items():
+            pieces.append(STRING.to_bytes(0, name))
+            if self.version != 2:
+                _write_payload(pieces, 1, value)
+                continue
+            pieces.append(JceType.head_byte(1, 8) + INT.to_bytes(0, len(value)))
+            for type_name, payload in value.items():
+                pieces.append(STRING.to_bytes(0, type_name))
+                _write_payload(pieces, 1, payload)
+        return pieces
+
+    def names(self) -> List[str]:
+        return list(self._items())
+
+    def get_raw(self, name: str, type_name: Optional[str] = None) -> Buffer:
+        payload = self._payload(name, type_name)
+        return payload[0] if len(payload) == 1 else b"".join(payload)
+
+    def get(
+        self,
+        name: str,
+        jce_struct: Type[S],
+        type_name: Optional[str] = None,
+        **extra,
+    ) -> S:
+        payload = self._payload(name, type_name)
+        if (
+            len(payload) == 3
+            and payload[0] is _STRUCT_START
+            and payload[2] is _STRUCT_END
+        ):
+            # put by this packet, the struct body is still separate
+            return jce_struct.decode(payload[1], **extra)
+
+        view = memoryview(self.get_raw(name, type_name))
+        decoder = self.__jce_decoder__
+        _, type_, head_length = decoder.decode_head(view)
+        if type_ != 10:
+            raise TypeError(f"Value of {name!r} is not a struct")
+        offset = head_length
+        while True:
+            _, type_, field_head_length = decoder.decode_head(view, offset)
+            if type_ == 11:
+                break
+            offset = decoder.skip_field(view, type_, offset + field_head_length)
+        return jce_struct.decode(view[head_length:offset], **extra)
+
+    def put(
+        self,
+        name: str,
+        value: Union[JceStruct, Buffer],
+        type_name: Optional[str] = None,
+    ) -> None:
+        # value is a struct or its already encoded body (JceStruct.encode)
+        if isinstance(value, JceStruct):
+            value = value.encode()
+        payload = (_STRUCT_START, value, _STRUCT_END)
+        data = self._items()
+        if self.version != 2:
+            data[name] = payload
+        elif type_name is None:
+            raise ValueError("type_name is required for version 2 packets")
+        else:
+            data.setdefault(name, {})[type_name] = payload
+        self._buffer = None
+
+    @classmethod
+    def decode(cls, data: Buffer) -> "RequestPacket":
+        view = memoryview(data)
+        decoder = cls.__jce_decoder__
+        packet = cls()
+        offset = 0
+        try:
+            while offset < len(view):
+                jce_id, type_, head_length = decoder.decode_head(view, offset)
+                kind = _HEAD_KIND.get(type_)
+                field = _FIELDS.get(jce_id)
+                if jce_id == 7 and kind == _BYTES:
+                    packet.buffer, offset = _read_bytes(view, offset, decoder)
+                elif field is None or field[1] != kind:
+                    offset = decoder.skip_field(
+                        view, type_, offset + head_length
+                    )
+                elif kind == _INT:
+                    value, offset = decoder.decode_int(view, offset)
+                    setattr(packet, field[0], value)
+                elif kind == _STRING:
+                    value, offset = _read_string(view, offset, decoder)
+                    setattr(packet, field[0], value)
+                else:
+                    value, offset = _read_map(
+                        view, offset, decoder, _read_string
+                    )
+                    setattr(packet, field[0], value)
+        except (IndexError, struct.error):
+            raise ValueError("Unexpected end of data") from None
+        return packet
+
+    def encode(self) -> bytes:
+        pieces: List[Buffer] = [
+            INT.to_bytes(1, self.version),
+            INT.to_bytes(2, self.packet_type),
+            INT.to_bytes(3, self.message_type),
+            INT.to_bytes(4, self.request_id),
+            STRING.to_bytes(5, self.servant_name),
+            STRING.to_bytes(6, self.func_name),
+        ]
+        if self._buffer is None:
+            _write_payload(pieces, 7, tuple(self._buffer_pieces()))
+        else:
+            _write_payload(pieces, 7, (self._buffer,))
+        pieces.append(INT.to_bytes(8, self.timeout))
+        pieces.append(_write_string_map(9, self.context))
+        pieces.append(_write_string_map(10, self.status))
+        return b"".join(pieces)
@@ -0,0 +1,151 @@
+import struct
+from types import TracebackType
+from typing import Any, Set, Type, BinaryIO, Iterable, Optional
+
+from .types import (
+    INT,
+    LIST,
+    JceType,
+    JceStruct,
+    JceModelField,
+    _encode_item,
+    _item_encoder,
+    _typed_container,
+)
+
+_LIST_HEAD = LIST.__jce_type__[0]
+# head type of a count written as four bytes, patched in later
+_INT32_HEAD = INT.__jce_type__[1]
+
+
+class StreamEncoder:
+    # Writes the fields of a struct to a binary stream one at a time, in
+    # tag order. LIST fields may be written from an iterator, items are
+    # encoded as they come and only buffer_size bytes are held at once.
+    # Values are encoded as they are, without pydantic validation.
+
+    def __init__(
+        self,
+        fp: BinaryIO,
+        jce_struct: Type[JceStruct],
+        *,
+        buffer_size: int = 1 << 16,
+    ):
+        self.fp = fp
+        self.jce_struct = jce_struct
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._written: Set[str] = set()
+        self._last_id = -1
+
+    def __enter__(self) -> "StreamEncoder":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+
+    def _field(self, name: str) -> JceModelField:
+        # checks the field can be written next, see _mark_written
+        field = self.jce_struct.__jce_fields__.get(name)
+        if field is None:
+            raise KeyError(f"{self.jce_struct.__name__} has no field {name}")
+        elif field.jce_id <= self._last_id:
+            raise ValueError(
+                f"Field {name} (tag {field.jce_id}) written out of order, "
+                f"after tag {self._last_id}"
+            )
+        return field
+
+    def _mark_written(self, name: str, field: JceModelField) -> None:
+        self._last_id = field.jce_id
+        self._written.add(name)
+
+    def _write(self, data: bytes) -> None:
+        self._buffer += data
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.fp.write(self._buffer)
+            self._buffer = bytearray()
+
+    def write(self, name: str, value: Any) -> None:
+        field = self._field(name)
+        self._mark_written(name, field)
+        encoder = self.jce_struct.__jce_encoder__
+        if isinstance(value, JceType):
+            self._write(encoder.encode_by_value(field.jce_id, value))
+        elif _typed_container(field):
+            self._write(
+                encoder.encode_by_type(
+                    field.jce_id, field.jce_type, value, field.jce_args
+                )
+            )
+        else:
+            self._write(
+                encoder.encode_by_type(field.jce_id, field.jce_type, value)
+            )
+
+    def write_list(
+        self, name: str, items: Iterable[Any], count: Optional[int] = None
+    ) -> int:
+        # Without count the stream must be seekable, four bytes are
+        # reserved for the count and patched once the items are written.
+        # Returns the number of items.
+        if count is None and not self.fp.seekable():
+            raise ValueError("Item count required for unseekable streams")
+        field = self._field(name)
+        if not issubclass(field.jce_type, LIST):
+            raise TypeError(f"Field {name} is not a LIST")
+        self._mark_written(name, field)
+        self._write(JceType.head_byte(field.jce_id, _LIST_HEAD))
+        if count is None:
+            self.flush()
+            position = self.fp.tell()
+            self._write(JceType.head_byte(0, _INT32_HEAD) + bytes(4))
+        else:
+            self._write(INT.to_bytes(0, count))
+
+        to_bytes = (
+            _item_encoder(field.jce_args[0])
+            if len(field.jce_args) == 1 and not field.pre_validate
+            else None
+        )
+        written = 0
+        for item in items:
+            if to_bytes is None:
+                self._write(_encode_item(0, item))
+            else:
+                self._write(to_bytes(0, item))
+            written += 1
+
+        if count is None:
+            self.flush()
+            end = self.fp.tell()
+            self.fp.seek(position + 1)
+            self.fp.write(struct.pack(">i", written))
+            self.fp.seek(end)
+        elif written != count:
+            raise ValueError(
+                f"Expected {count} items for {name}, got {written}"
+            )
+        return written
+
+    def close(self) -> None:
+        # the stream itself is left open
+        missing = [
+            name
+            for name in self.jce_struct.__jce_fields__
+            if name not in self._written
+            and self.jce_struct.__fields__[name].required
+        ]
+        if missing:
+            raise ValueError(f"Required fields not written: {missing}")
+        self.flush()
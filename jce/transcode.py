@@ -0,0 +1,333 @@
+import json
+import base64
+from json.encoder import encode_basestring
+from typing import (
+    IO,
+    Any,
+    Dict,
+    List,
+    Type,
+    Tuple,
+    Union,
+    Mapping,
+    Iterable,
+    Optional,
+)
+
+from .events import Event, iter_events
+from .types import (
+    INT,
+    MAP,
+    BOOL,
+    BYTE,
+    LIST,
+    BYTES,
+    FLOAT,
+    DOUBLE,
+    STRING,
+    LAZY_MAP,
+    COMPRESSED,
+    LAZY_STRING,
+    JceType,
+    JceStruct,
+    JceDecoder,
+    JceModelField,
+    resolve_jce_type,
+)
+
+_TOP, _STRUCT, _LIST, _MAP = 0, 1, 2, 3
+
+# struct -> {jce_id: (json key, jce type, jce args)}
+_Schema = Dict[int, Tuple[str, Optional[Type[JceType]], Tuple[Any, ...]]]
+
+
+def _struct_schema(
+    struct: Optional[Type[JceStruct]], cache: Dict[type, _Schema]
+) -> Optional[_Schema]:
+    if struct is None:
+        return None
+    schema = cache.get(struct)
+    if schema is None:
+        schema = {
+            field.jce_id: (
+                encode_basestring(name),
+                field.jce_type,
+                field.jce_args,
+            )
+            for name, field in struct.__jce_fields__.items()
+        }
+        cache[struct] = schema
+    return schema
+
+
+def _item_types(
+    jce_args: Tuple[Any, ...], count: int
+) -> Tuple[Tuple[Optional[Type[JceType]], Tuple[Any, ...]], ...]:
+    if len(jce_args) != count:
+        return ((None, ()),) * count
+    return tuple(resolve_jce_type(arg) for arg in jce_args)
+
+
+def _scalar_json(
+    value: Any, type_: int, jce_type: Optional[Type[JceType]]
+) -> str:
+    if value is None:
+        return "null"
+    elif type_ == 0 or type_ == 12:
+        number = int.from_bytes(value, "big", signed=True)
+        if jce_type is not None and issubclass(jce_type, BOOL):
+            return "true" if number else "false"
+        return str(number)
+    elif isinstance(value, str):
+        return encode_basestring(value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        return '"' + base64.b64encode(value).decode() + '"'
+    elif isinstance(value, int) and not isinstance(value, bool):
+        if jce_type is not None and issubclass(jce_type, BOOL):
+            return "true" if value else "false"
+        return str(value)
+    return json.dumps(value, default=str)
+
+
+def _json_key(value: Any, type_: int) -> str:
+    text = _scalar_json(value, type_, None)
+    return text if text.startswith('"') else encode_basestring(text)
+
+
+def _transcode(
+    data: bytes,
+    out: List[str],
+    struct: Optional[Type[JceStruct]],
+    default_types: Optional[Mapping[int, Type[JceType]]],
+    decoder: Type[JceDecoder],
+    cache: Dict[type, _Schema],
+) -> None:
+    # state of the innermost open container: kind, struct schema,
+    # declared item types, no item written yet, last item was a map key
+    kind, schema, items = _TOP, _struct_schema(struct, cache), ()
+    first, is_key = True, False
+    # declared type of the next value
+    jce_type: Optional[Type[JceType]] = None
+    jce_args: Tuple[Any, ...] = ()
+    type_ = 0
+    # open containers and the output saved while a map key is rendered
+    stack: List[tuple] = []
+    captures: List[Tuple[int, List[str]]] = []
+
+    out.append("{")
+    for event in iter_events(data, default_types, decoder):
+        event_type = event[0]
+        if event_type == Event.FIELD:
+            _, jce_id, type_, _ = event
+            if first:
+                first = False
+            elif not (kind == _MAP and is_key):
+                out.append(",")
+
+            if kind == _TOP or kind == _STRUCT:
+                field = schema.get(jce_id) if schema else None
+                if field is None:
+                    out.append(f'"{jce_id}":')
+                    jce_type, jce_args = None, ()
+                else:
+                    out.append(field[0] + ":")
+                    jce_type, jce_args = field[1], field[2]
+            elif kind == _LIST:
+                jce_type, jce_args = items[0]
+            else:
+                is_key = not is_key
+                jce_type, jce_args = items[0] if is_key else items[1]
+        elif event_type == Event.VALUE:
+            if kind == _MAP and is_key:
+                out.append(_json_key(event[1], type_) + ":")
+            else:
+                out.append(_scalar_json(event[1], type_, jce_type))
+        elif event_type in (Event.STRUCT_END, Event.LIST_END, Event.MAP_END):
+            out.append("]" if event_type == Event.LIST_END else "}")
+            kind, schema, items, first, is_key = stack.pop()
+            if captures and captures[-1][0] == len(stack):
+                key = "".join(out)
+                out = captures.pop()[1]
+                out.append(encode_basestring(key) + ":")
+        else:
+            if kind == _MAP and is_key:
+                captures.append((len(stack), out))
+                out = []
+            stack.append((kind, schema, items, first, is_key))
+            first, is_key = True, False
+            if event_type == Event.STRUCT_START:
+                out.append("{")
+                kind, items = _STRUCT, ()
+                schema = _struct_schema(
+                    jce_type
+                    if jce_type is not None and issubclass(jce_type, JceStruct)
+                    else None,
+                    cache,
+                )
+            elif event_type == Event.LIST_START:
+                out.append("[")
+                kind, schema = _LIST, None
+                items = (
+                    _item_types(jce_args, 1)
+                    if jce_type is not None and issubclass(jce_type, LIST)
+                    else ((None, ()),)
+                )
+            else:
+                out.append("{")
+                kind, schema = _MAP, None
+                items = (
+                    _item_types(jce_args, 2)
+                    if jce_type is not None
+                    and issubclass(jce_type, (MAP, LAZY_MAP))
+                    else ((None, ()), (None, ()))
+                )
+    out.append("}")
+
+
+def to_json(
+    data: bytes,
+    struct: Optional[Type[JceStruct]] = None,
+    *,
+    default_types: Optional[Mapping[int, Type[JceType]]] = None,
+    decoder: Type[JceDecoder] = JceDecoder,
+) -> str:
+    out: List[str] = []
+    _transcode(data, out, struct, default_types, decoder, {})
+    return "".join(out)
+
+
+def write_json(
+    data: bytes,
+    fp: IO[str],
+    struct: Optional[Type[JceStruct]] = None,
+    *,
+    default_types: Optional[Mapping[int, Type[JceType]]] = None,
+    decoder: Type[JceDecoder] = JceDecoder,
+) -> None:
+    fp.write(
+        to_json(data, struct, default_types=default_types, decoder=decoder)
+    )
+
+
+def write_jsonl(
+    records: Iterable[bytes],
+    fp: IO[str],
+    struct: Optional[Type[JceStruct]] = None,
+    *,
+    default_types: Optional[Mapping[int, Type[JceType]]] = None,
+    decoder: Type[JceDecoder] = JceDecoder,
+) -> int:
+    count = 0
+    cache: Dict[type, _Schema] = {}
+    for record in records:
+        out: List[str] = []
+        _transcode(record, out, struct, default_types, decoder, cache)
+        out.append("\n")
+        fp.write("".join(out))
+        count += 1
+    return count
+
+
+def _key_from_json(key: str, jce_type: Optional[Type[JceType]]) -> Any:
+    # map keys are always strings in JSON, restore the declared type
+    if jce_type is None or issubclass(jce_type, (STRING, BYTES, LAZY_STRING)):
+        return key
+    return json.loads(key)
+
+
+def _encode_json(
+    jce_id: int,
+    value: Any,
+    jce_type: Optional[Type[JceType]],
+    jce_args: Tuple[Any, ...],
+    out: bytearray,
+) -> None:
+    if value is None:
+        return
+    if jce_type is None:
+        jce_type, jce_args = _guess_type(value)
+
+    if issubclass(jce_type, JceStruct):
+        out += JceType.head_byte(jce_id, 10)
+        _encode_object(value, jce_type, out)
+        out += JceType.head_byte(jce_id, 11)
+    elif issubclass(jce_type, LIST):
+        item_type, item_args = _item_types(jce_args, 1)[0]
+        out += JceType.head_byte(jce_id, 9)
+        out += INT.to_bytes(0, len(value))
+        for item in value:
+            _encode_json(0, item, item_type, item_args, out)
+    elif issubclass(jce_type, (MAP, LAZY_MAP)):
+        (key_type, key_args), (value_type, value_args) = _item_types(
+            jce_args, 2
+        )
+        out += JceType.head_byte(jce_id, 8)
+        out += INT.to_bytes(0, len(value))
+        for key, item in value.items():
+            key = _key_from_json(key, key_type)
+            _encode_json(0, key, key_type, key_args, out)
+            _encode_json(1, item, value_type, value_args, out)
+    elif issubclass(jce_type, (BYTES, COMPRESSED)):
+        # compressed values are kept as their compressed bytes
+        out += BYTES.to_bytes(jce_id, base64.b64decode(value))
+    elif issubclass(jce_type, (BYTE, BOOL)):
+        out += BYTE.to_bytes(jce_id, bytes([int(value) & 0xFF]))
+    elif issubclass(jce_type, INT):
+        out += INT.to_bytes(jce_id, int(value))
+    elif issubclass(jce_type, (FLOAT, DOUBLE)):
+        out += jce_type.to_bytes(jce_id, float(value))
+    elif issubclass(jce_type, STRING):
+        out += STRING.to_bytes(jce_id, value)
+    else:
+        out += jce_type.to_bytes(jce_id, jce_type.validate(value))
+
+
+def _guess_type(value: Any) -> Tuple[Type[JceType], Tuple[Any, ...]]:
+    if isinstance(value, bool):
+        return BOOL, ()
+    elif isinstance(value, int):
+        return INT, ()
+    elif isinstance(value, float):
+        return DOUBLE, ()
+    elif isinstance(value, str):
+        return STRING, ()
+    elif isinstance(value, list):
+        return LIST, ()
+    elif isinstance(value, dict):
+        # objects keyed by valid tags are taken as structs
+        if all(key.isdigit() and int(key) < 256 for key in value):
+            return JceStruct, ()
+        return MAP, (STRING, Any)
+    raise TypeError(f"Unsupported JSON value: {value!r}")
+
+
+def _encode_object(
+    value: Dict[str, Any], struct: Type[JceStruct], out: bytearray
+) -> None:
+    if not isinstance(value, dict):
+        raise TypeError(f"Invalid struct value: {type(value)}")
+    fields: Dict[int, Tuple[Any, Optional[JceModelField]]] = {}
+    jce_fields = struct.__jce_fields__
+    for key, item in value.items():
+        field = jce_fields.get(key)
+        if field is not None:
+            fields[field.jce_id] = (item, field)
+        elif key.isdigit():
+            fields.setdefault(int(key), (item, None))
+    for jce_id in sorted(fields):
+        item, field = fields[jce_id]
+        if field is None:
+            _encode_json(jce_id, item, None, (), out)
+        else:
+            _encode_json(jce_id, item, field.jce_type, field.jce_args, out)
+
+
+def from_json(
+    value: Union[str, bytes, Dict[str, Any]],
+    struct: Optional[Type[JceStruct]] = None,
+) -> bytes:
+    if isinstance(value, (str, bytes)):
+        value = json.loads(value)
+    out = bytearray()
+    _encode_object(value, struct or JceStruct, out)  # type: ignore
+    return bytes(out)
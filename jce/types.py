@@ -1,24 +1,45 @@
 import abc
+import sys
+import mmap
+import zlib
 import struct
 import warnings
-from typing_extensions import get_origin
+import functools
+from types import MappingProxyType
+from typing_extensions import get_args, get_origin
 from typing import (
     TYPE_CHECKING,
     Any,
+    Set,
     Dict,
     List,
     Type,
     Tuple,
+    Union,
+    Generic,
     Mapping,
     TypeVar,
+    BinaryIO,
+    Callable,
     Iterable,
+    Iterator,
     Optional,
+    Generator,
 )
 
-from pydantic import Field, BaseModel
 from pydantic.main import ModelMetaclass
 from pydantic.typing import NoArgAnyCallable
 from pydantic.fields import Undefined, ModelField
+from pydantic import (
+    Field,
+    BaseModel,
+    PrivateAttr,
+    ValidationError,
+    parse_obj_as,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
 
 T = TypeVar("T", bound="JceType")
 VT = TypeVar("VT", bound="JceType")
@@ -41,6 +62,7 @@ def JceField(
     *,
     jce_id: int,
     jce_type: Optional[Type["JceType"]] = None,
+    omit_default: Optional[bool] = None,
     default_factory: Optional[NoArgAnyCallable] = None,
     alias: str = None,
     title: str = None,
@@ -81,6 +103,7 @@ def JceField(
         regex=regex,
         jce_id=jce_id,
         jce_type=jce_type,
+        omit_default=omit_default,
         **extra,
     )
 
@@ -89,36 +112,288 @@ class JceModelField:
     class NotJceModelField(Exception):
         pass
 
-    def __init__(self, jce_id: int, jce_type: Type["JceType"]):
+    def __init__(
+        self,
+        jce_id: int,
+        jce_type: Type["JceType"],
+        jce_args: Tuple[Any, ...] = (),
+        pre_validate: bool = False,
+        omit_default: bool = False,
+        default: Any = None,
+    ):
         if not isinstance(jce_id, int) or jce_id < 0:
             raise ValueError(f"Invalid JCE ID")
         if not issubclass(jce_type, JceType):
             raise ValueError(f"Invalid JCE Type")
         self.jce_id: int = jce_id
         self.jce_type: Type[JceType] = jce_type
+        # declared item types, e.g. (key, value) of MAP[STRING, BYTES]
+        self.jce_args: Tuple[Any, ...] = jce_args
+        # jce_type differs from the annotation, pydantic will not validate it
+        self.pre_validate: bool = pre_validate
+        # not encoded while the value equals default, decoding fills it in
+        self.omit_default: bool = omit_default
+        self.default: Any = default
 
     def __str__(self) -> str:
         return f"<JceModelField id:{self.jce_id} type:{self.jce_type}>"
 
     @classmethod
-    def from_modelfield(cls, field: ModelField) -> "JceModelField":
+    def from_modelfield(
+        cls, field: ModelField, omit_default: bool = False
+    ) -> "JceModelField":
         field_info = field.field_info
         jce_id = field_info.extra.get("jce_id")
-        jce_type = (
-            field_info.extra.get("jce_type")
-            or get_origin(field.outer_type_)
-            or field.outer_type_
-        )
+        annotation = get_origin(field.outer_type_) or field.outer_type_
+        jce_type = field_info.extra.get("jce_type") or annotation
         if jce_id is None or not issubclass(jce_type, JceType):
             raise cls.NotJceModelField
-        return cls(jce_id, jce_type)
+        # the field option wins over the struct Config, required fields
+        # are always encoded
+        field_omit = field_info.extra.get("omit_default")
+        if field_omit is not None:
+            omit_default = field_omit
+        omit_default = omit_default and not field.required
+        return cls(
+            jce_id,
+            jce_type,
+            get_args(field.outer_type_),
+            jce_type is not annotation,
+            omit_default,
+            field.get_default() if omit_default else None,
+        )
+
+
+def resolve_jce_type(
+    annotation: Any,
+) -> Tuple[Optional[Type["JceType"]], Tuple[Any, ...]]:
+    # split an annotation like LIST[INT32] into (LIST, (INT32,)),
+    # (None, ()) if it is not a jce type
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Union and len(args) == 2 and type(None) in args:
+        return resolve_jce_type(args[0] if args[1] is type(None) else args[1])
+    origin = origin or annotation
+    if isinstance(origin, type) and issubclass(origin, JceType):
+        return origin, args
+    return None, ()
+
+
+def _typed_container(field: JceModelField) -> bool:
+    # LIST[T] or MAP[K, V] field with usable item types
+    return (
+        bool(field.jce_args)
+        and not field.pre_validate
+        and issubclass(field.jce_type, (LIST, MAP))
+    )
+
+
+def _item_encoder(annotation: Any) -> Optional[Callable[[int, Any], bytes]]:
+    # to_bytes of the declared item type, None if items encode themselves.
+    # Struct items may be instances of a subclass and always do.
+    jce_type, jce_args = resolve_jce_type(annotation)
+    if jce_type is None or issubclass(jce_type, JceStruct):
+        return None
+    elif jce_args and issubclass(jce_type, (LIST, MAP)):
+        to_bytes = jce_type.to_bytes
+        return lambda jce_id, value: to_bytes(  # type: ignore
+            jce_id, value, jce_args
+        )
+    return jce_type.to_bytes
+
+
+def _encode_item(jce_id: int, value: Any) -> bytes:
+    # items without a declared jce type, plain python values are encoded
+    # by the guessed type like MAP.validate wraps them
+    if isinstance(value, JceType):
+        return value.to_bytes(jce_id, value)
+    return guess_jce_type(value).to_bytes(jce_id, value)
+
+
+# {jce_id: (name, schema node, jce type to pre validate with)}, the
+# (name, jce type) pairs of the pre validated fields and what to do with
+# unknown tags, see Config.jce_unknown_tags
+_Schema = Tuple[
+    Dict[int, Tuple[str, Any, Optional[Type["JceType"]]]],
+    Tuple[Tuple[str, Type["JceType"]], ...],
+    Optional[str],
+]
+
+_UNKNOWN_TAGS = (None, "preserve", "skip")
+
+
+def _schema_node(jce_type: Optional[Type["JceType"]], jce_args: Any) -> Any:
+    # what decoding knows about a declared type: the struct class,
+    # (_LIST, item node), (_MAP, key node, value node), (_STRING, lazy
+    # string type), (_LAZY_MAP, lazy map loader) or None
+    if jce_type is None:
+        return None
+    elif issubclass(jce_type, JceStruct):
+        validate = jce_type.validate.__func__  # type: ignore
+        if (
+            jce_type is not JceStruct
+            and validate is JceStruct.validate.__func__  # type: ignore
+        ):
+            return jce_type
+    elif issubclass(jce_type, LAZY_STRING):
+        return (_STRING, jce_type)
+    elif issubclass(jce_type, LAZY_MAP):
+        return (_LAZY_MAP, functools.partial(jce_type._decode_at, jce_args))
+    elif issubclass(jce_type, LIST) and len(jce_args) == 1:
+        item = _schema_node(*resolve_jce_type(jce_args[0]))
+        if item is not None:
+            return (_LIST, item)
+    elif issubclass(jce_type, MAP) and len(jce_args) == 2:
+        key = _schema_node(*resolve_jce_type(jce_args[0]))
+        value = _schema_node(*resolve_jce_type(jce_args[1]))
+        if key is not None or value is not None:
+            return (_MAP, key, value)
+    return None
+
+
+def _struct_schema(jce_struct: Type["JceStruct"]) -> Optional[_Schema]:
+    # cached on the class like __jce_fields__, None if fields share a tag
+    try:
+        return jce_struct.__dict__["__jce_schema__"]
+    except KeyError:
+        pass
+    fields: Dict[int, Tuple[str, Any, Optional[Type[JceType]]]] = {}
+    pre_validate = []
+    for name, field in jce_struct.__jce_fields__.items():
+        if field.pre_validate:
+            fields[field.jce_id] = (name, None, field.jce_type)
+            pre_validate.append((name, field.jce_type))
+        else:
+            node = _schema_node(field.jce_type, field.jce_args)
+            fields[field.jce_id] = (name, node, None)
+    unknown_tags = getattr(jce_struct.__config__, "jce_unknown_tags", None)
+    if unknown_tags not in _UNKNOWN_TAGS:
+        raise ValueError(
+            f"Invalid jce_unknown_tags {unknown_tags!r} in struct "
+            f'"{jce_struct.__name__}", expect "preserve" or "skip"'
+        )
+    schema: Optional[_Schema] = (fields, tuple(pre_validate), unknown_tags)
+    if len(fields) != len(jce_struct.__jce_fields__):
+        schema = None
+    setattr(jce_struct, "__jce_schema__", schema)
+    return schema
+
+
+# key of the preserved unknown tags in the decoded top level dict
+_UNKNOWN = "__jce_unknown__"
+
 
+def _unknown_spans(unknown_tags: Optional[str]) -> Any:
+    # None to decode unknown tags like the others, "skip" or a list to
+    # collect the (jce_id, encoded field) pairs in
+    return [] if unknown_tags == "preserve" else unknown_tags
 
-def prepare_fields(fields: Dict[str, ModelField]) -> Dict[str, JceModelField]:
+
+def _set_unknown(value: Any, unknown: Iterable[Tuple[int, bytes]]) -> None:
+    # structs failing validation are left as they are
+    if isinstance(value, JceStruct):
+        object.__setattr__(value, _UNKNOWN, tuple(unknown))
+
+
+def _build_struct(
+    jce_struct: Type[S], values: Dict[str, Any], extra: Optional[Dict[str, Any]]
+) -> Any:
+    # Same as JceStruct.validate for the values collected by field name.
+    # Invalid values are returned as they are, the enclosing field then
+    # fails with the usual error.
+    if extra:
+        model_fields = jce_struct.__fields__
+        for name, value in extra.items():
+            if name in model_fields:
+                values.setdefault(name, value)
+    data = values
+    pre_validate = _struct_schema(jce_struct)[1]  # type: ignore
+    try:
+        if pre_validate:
+            data = dict(values)
+            for name, jce_type in pre_validate:
+                if name in data:
+                    data[name] = jce_type.validate(data[name])
+        return jce_struct.parse_obj(data)
+    except (ValidationError, TypeError, ValueError):
+        return values
+
+
+def _iter_list_items(
+    source: Union[bytes, bytearray, memoryview, mmap.mmap, BinaryIO],
+    jce_id: int,
+    decoder: Type["JceDecoder"],
+) -> Iterator[Tuple[int, bytes]]:
+    # (tag, bytes) of each item of the list field jce_id. A file-like
+    # source is read in growing chunks and consumed items are dropped, so
+    # only the current item has to fit in memory.
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        buffer: Any = memoryview(source)
+        read: Callable[[int], bytes] = lambda size: b""
+    else:
+        buffer, read = bytearray(), source.read
+
+    def fill(size: int) -> bool:
+        # append up to size bytes, short reads are repeated
+        added = 0
+        while added < size:
+            chunk = read(size - added)
+            if not chunk:
+                break
+            buffer.extend(chunk)
+            added += len(chunk)
+        return added > 0
+
+    def parse(func: Callable[..., Any], *args) -> Any:
+        # retry with twice the data until the field is complete
+        while True:
+            try:
+                return func(buffer, *args)
+            except (ValueError, IndexError, struct.error) as e:
+                if not fill(max(len(buffer), 1 << 16)):
+                    if isinstance(e, ValueError):
+                        raise
+                    raise ValueError("Unexpected end of data") from None
+
+    offset = 0
+    try:
+        while True:
+            if isinstance(buffer, bytearray) and offset >= len(buffer) // 2:
+                del buffer[:offset]
+                offset = 0
+            if offset >= len(buffer) and not fill(1 << 16):
+                break
+            tag, type_, head_length = parse(decoder.decode_head, offset)
+            if tag != jce_id:
+                offset = parse(decoder.skip_field, type_, offset + head_length)
+                continue
+            elif type_ != 9:
+                break
+            count, offset = parse(decoder.decode_int, offset + head_length)
+            for _ in range(count):
+                if isinstance(buffer, bytearray) and offset >= len(buffer) // 2:
+                    del buffer[:offset]
+                    offset = 0
+                item_id, type_, head_length = parse(decoder.decode_head, offset)
+                end = parse(decoder.skip_field, type_, offset + head_length)
+                yield item_id, bytes(buffer[offset:end])
+                offset = end
+            return
+    finally:
+        if isinstance(buffer, memoryview):
+            buffer.release()
+    raise TypeError(f"Value at jce_id {jce_id} is not a list")
+
+
+def prepare_fields(
+    fields: Dict[str, ModelField], omit_default: bool = False
+) -> Dict[str, JceModelField]:
     jce_fields: Dict[str, JceModelField] = {}
     for name, field in fields.items():
         try:
-            jce_fields[name] = JceModelField.from_modelfield(field)
+            jce_fields[name] = JceModelField.from_modelfield(
+                field, omit_default
+            )
         except ValueError as e:
             warnings.warn(f"Error when parsing JCE field `{name}`: {repr(e)}")
         except JceModelField.NotJceModelField:
@@ -137,13 +412,17 @@ class JceEncoder:
 
     @staticmethod
     def encode_by_type(
-        jce_id: int, jce_type: Type["JceType"], jce_value: Any
+        jce_id: int,
+        jce_type: Type["JceType"],
+        jce_value: Any,
+        jce_args: Tuple[Any, ...] = (),
     ) -> bytes:
-        return (
-            jce_type.to_bytes(jce_id, jce_value)
-            if jce_value is not None
-            else b""
-        )
+        if jce_value is None:
+            return b""
+        elif jce_args:
+            # LIST and MAP encode plain items by the declared item types
+            return jce_type.to_bytes(jce_id, jce_value, jce_args)  # type: ignore
+        return jce_type.to_bytes(jce_id, jce_value)
 
     @classmethod
     def encode_raw(cls, data: Dict[int, "JceType"]) -> bytes:
@@ -157,33 +436,180 @@ class JceEncoder:
         cls, fields: Dict[str, JceModelField], data: "JceStruct"
     ) -> bytes:
         array = bytearray()
+        # preserved unknown tags go back in between the fields by tag
+        unknown = getattr(data, "__jce_unknown__", None) or ()
+        index = 0
         for name, field in fields.items():
             jce_id = field.jce_id
+            while index < len(unknown) and unknown[index][0] < jce_id:
+                array += unknown[index][1]
+                index += 1
             jce_value = data[name]
-            if isinstance(jce_value, JceType):
+            if field.omit_default and jce_value == field.default:
+                continue
+            elif isinstance(jce_value, JceType):
                 array += cls.encode_by_value(jce_id, jce_value)
+            elif _typed_container(field):
+                array += cls.encode_by_type(
+                    jce_id, field.jce_type, jce_value, field.jce_args
+                )
             else:
-                jce_type = field.jce_type
-                array += cls.encode_by_type(jce_id, jce_type, jce_value)
+                array += cls.encode_by_type(jce_id, field.jce_type, jce_value)
+        for _, encoded in unknown[index:]:
+            array += encoded
         return bytes(array)
 
 
+# body length of fixed size head types
+_FIXED_SIZE = {0: 1, 1: 2, 2: 4, 3: 8, 4: 4, 5: 8, 11: 0, 12: 0}
+_INT_FORMAT = {0: ">b", 1: ">h", 2: ">i", 3: ">q"}
+
+# decode plan kinds, see _decode_plan
+_TOP, _STRUCT, _LIST, _MAP = 0, 1, 2, 3
+_FIXED, _STRING, _BYTES, _ZERO, _END, _CUSTOM = 4, 5, 6, 7, 8, 9
+# schema node kind of LAZY_MAP, see _schema_node
+_LAZY_MAP = 10
+
+
+class Dedup:
+    # Opt-in sharing of equal values for native decoding. Containers whose
+    # encoding is at most max_size bytes, and strings up to that length, are
+    # decoded once, later ones with the same bytes get the same object.
+    # Shared values must not be modified. One instance may be passed to
+    # several decodes, it keeps the values it has seen alive.
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        # values replaced by a shared one, and their estimated size
+        self.hits = 0
+        self.saved_bytes = 0
+        # encoding -> [value, deep size or None until the first hit]
+        self._values: Dict[Any, List[Any]] = {}
+        self._strings: Dict[str, str] = {}
+        self._ids: Set[int] = set()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(hits={self.hits}, "
+            f"saved_bytes={self.saved_bytes})"
+        )
+
+    def _share(self, key: Any, value: Any) -> Any:
+        entry = self._values.get(key)
+        if entry is None:
+            self._values[key] = [value, None]
+            self._ids.add(id(value))
+            return value
+        if entry[1] is None:
+            entry[1] = self._size(value)
+        self.hits += 1
+        self.saved_bytes += entry[1]
+        return entry[0]
+
+    def _share_string(self, value: str) -> str:
+        shared = self._strings.setdefault(value, value)
+        if shared is not value:
+            self.hits += 1
+            self.saved_bytes += sys.getsizeof(value)
+        return shared
+
+    def _size(self, value: Any) -> int:
+        # size of the objects only the value holds, shared ones are kept
+        size = sys.getsizeof(value)
+        if isinstance(value, list):
+            items: Iterable[Any] = value
+        elif isinstance(value, dict):
+            items = (*value.keys(), *value.values())
+        else:
+            return size
+        for item in items:
+            if id(item) in self._ids:
+                continue
+            elif isinstance(item, str):
+                if self._strings.get(item) is not item:
+                    size += sys.getsizeof(item)
+            else:
+                size += self._size(item)
+        return size
+
+
 class JceDecoder:
+    max_depth: int = 1000
+
     @staticmethod
-    def decode_head(jce_byte: bytes) -> Tuple[int, int, int]:
-        type_byte: int = struct.unpack_from(">B", jce_byte)[0]
+    def decode_head(jce_byte: bytes, offset: int = 0) -> Tuple[int, int, int]:
+        type_byte: int = struct.unpack_from(">B", jce_byte, offset)[0]
         type_ = type_byte & 0xF
         jce_id = type_byte >> 4
         if jce_id == 0xF:
-            jce_id = struct.unpack_from(">B", jce_byte, 1)[0]
+            jce_id = struct.unpack_from(">B", jce_byte, offset + 1)[0]
             return jce_id, type_, 2
         return jce_id, type_, 1
 
+    @classmethod
+    def decode_int(cls, jce_byte: bytes, offset: int = 0) -> Tuple[int, int]:
+        _, type_, head_length = cls.decode_head(jce_byte, offset)
+        offset += head_length
+        if type_ == 12:
+            return 0, offset
+        format_ = _INT_FORMAT.get(type_)
+        if format_ is None:
+            raise TypeError(f"Invalid integer head type: {type_}")
+        return (
+            struct.unpack_from(format_, jce_byte, offset)[0],
+            offset + _FIXED_SIZE[type_],
+        )
+
+    @classmethod
+    def skip_field(cls, jce_byte: bytes, type_: int, offset: int = 0) -> int:
+        # skip the body of a field whose head ends at offset without
+        # decoding it and return the offset right after the body.
+        # remaining item count of each open container, -1 for structs
+        stack: List[int] = []
+        try:
+            while True:
+                if type_ in _FIXED_SIZE:
+                    offset += _FIXED_SIZE[type_]
+                elif type_ == 6:
+                    offset += 1 + jce_byte[offset]
+                elif type_ == 7:
+                    offset += 4 + struct.unpack_from(">I", jce_byte, offset)[0]
+                elif type_ == 8 or type_ == 9:
+                    count, offset = cls.decode_int(jce_byte, offset)
+                    if count > 0:
+                        stack.append(count * 2 if type_ == 8 else count)
+                elif type_ == 10:
+                    stack.append(-1)
+                elif type_ == 13:
+                    length, offset = cls.decode_int(jce_byte, offset + 1)
+                    offset += length
+                else:
+                    raise ValueError(f"Unknown JceType for id {type_}")
+
+                while stack:
+                    if stack[-1] == 0:
+                        stack.pop()
+                        continue
+                    _, type_, head_length = cls.decode_head(jce_byte, offset)
+                    offset += head_length
+                    if stack[-1] > 0:
+                        stack[-1] -= 1
+                        break
+                    if type_ != 11:
+                        break
+                    stack.pop()
+                else:
+                    break
+        except (IndexError, struct.error):
+            raise ValueError("Unexpected end of data") from None
+        if offset > len(jce_byte):
+            raise ValueError("Unexpected end of data")
+        return offset
+
     @classmethod
     def decode_single(
         cls,
         jce_byte: bytes,
-        default_types: Optional[Dict[int, Type["JceType"]]] = None,
+        default_types: Optional[Mapping[int, Type["JceType"]]] = None,
         **extra,
     ) -> Tuple[int, "JceType", int]:
         jce_id, type_, head_length = cls.decode_head(jce_byte)
@@ -198,12 +624,29 @@ class JceDecoder:
     def decode_bytes(
         cls,
         jce_byte: bytes,
-        default_types: Optional[Dict[int, Type["JceType"]]] = None,
+        default_types: Optional[Mapping[int, Type["JceType"]]] = None,
+        *,
+        native: bool = False,
+        dedup: Optional["Dedup"] = None,
         **extra,
     ) -> Dict[int, Any]:
+        # native returns plain int, float, str, bytes, list and dict values
+        # instead of JceType instances. Native values may be shared through
+        # dedup, see Dedup.
+        default_types = default_types or JceStruct.__jce_default_type__
+        decode_single = JceDecoder.decode_single.__func__  # type: ignore
+        if cls.decode_single.__func__ is decode_single:  # type: ignore
+            return cls._decode_stack(
+                jce_byte,
+                default_types,
+                extra,
+                not native,
+                dedup=dedup if native else None,
+            )
+
+        # keep honoring custom decoders which override decode_single
         offset = 0
         result = {}
-        default_types = default_types or JceStruct.__jce_default_type__
         while offset < len(jce_byte):
             jce_id, data, data_length = cls.decode_single(
                 jce_byte[offset:], default_types, **extra
@@ -212,6 +655,305 @@ class JceDecoder:
             offset += data_length
         return result
 
+    @classmethod
+    def _decode_raw(
+        cls,
+        jce_byte: bytes,
+        default_types: Optional[Mapping[int, Type["JceType"]]],
+        extra: Dict[str, Any],
+        schema: Optional["_Schema"] = None,
+    ) -> Dict[int, Any]:
+        # plain python values to be validated by the struct fields, each
+        # value is then converted only once. With a schema, structs inside
+        # the declared fields are built right away. Custom decoders still
+        # get their validated values.
+        default_types = default_types or JceStruct.__jce_default_type__
+        if cls._uses_stack():
+            return cls._decode_stack(
+                jce_byte, default_types, extra, False, schema
+            )
+        return cls.decode_bytes(jce_byte, default_types, **extra)
+
+    @classmethod
+    def _uses_stack(cls) -> bool:
+        decode_bytes = JceDecoder.decode_bytes.__func__  # type: ignore
+        decode_single = JceDecoder.decode_single.__func__  # type: ignore
+        return (
+            cls.decode_bytes.__func__ is decode_bytes  # type: ignore
+            and cls.decode_single.__func__ is decode_single  # type: ignore
+        )
+
+    @classmethod
+    def _decode_stack(
+        cls,
+        jce_byte: bytes,
+        default_types: Mapping[int, Type["JceType"]],
+        extra: Dict[str, Any],
+        validate: bool,
+        schema: Optional["_Schema"] = None,
+        dedup: Optional["Dedup"] = None,
+    ) -> Dict[int, Any]:
+        steps = cls._decode_steps(
+            jce_byte, default_types, extra, validate, 0, schema, dedup
+        )
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+        raise RuntimeError("Decoder paused without a chunk size")
+
+    @classmethod
+    def _decode_steps(
+        cls,
+        jce_byte: bytes,
+        default_types: Mapping[int, Type["JceType"]],
+        extra: Dict[str, Any],
+        validate: bool,
+        chunk_size: int,
+        schema: Optional["_Schema"] = None,
+        dedup: Optional["Dedup"] = None,
+    ) -> Generator[None, None, Dict[int, Any]]:
+        # Same result as decoding every field with decode_single, but nested
+        # containers are tracked on an explicit stack instead of recursing.
+        # Like the container from_bytes, nested fields use the global
+        # default types and only structs inside top level containers
+        # receive the extra values. Without validate the values are only
+        # converted by types with a custom validate. With a chunk size the
+        # generator pauses after every chunk_size fields.
+        # The schema of the top level struct follows the declared types
+        # down: a struct value of a known class is collected by field name
+        # and parsed when it is closed, see _schema_node.
+        # With dedup, containers and strings equal to one decoded before
+        # are replaced by it. Unknown tags of structs with a schema are
+        # skipped without decoding if their Config.jce_unknown_tags says
+        # so, preserved tags are kept as encoded, see _unknown_spans.
+        plan = _decode_plan(default_types, validate)
+        nested_plan = _decode_plan(JceStruct.__jce_default_type__, validate)
+        max_depth = cls.max_depth
+        decode_head = cls.decode_head
+        decode_int = cls.decode_int
+        skip_field = cls.skip_field
+        length = len(jce_byte)
+
+        result: Dict[int, Any] = {}
+        stack: List[tuple] = []
+        offset = 0
+        # state of the innermost open container
+        kind, items, container_type, remaining = _TOP, result, None, 0
+        key, container_id, with_extra, current_plan = _empty, 0, True, plan
+        # schema node of the items and struct class being collected
+        node: Any = schema[0] if schema is not None else None
+        target: Optional[Type[JceStruct]] = None
+        unknown: Any = None if schema is None else _unknown_spans(schema[2])
+        # offset after the head of the innermost open container
+        start = 0
+        countdown = chunk_size
+
+        while True:
+            if countdown:
+                countdown -= 1
+                if not countdown:
+                    yield
+                    countdown = chunk_size
+
+            if offset >= length:
+                if kind == _TOP:
+                    if unknown and unknown != "skip":
+                        result[_UNKNOWN] = tuple(unknown)  # type: ignore
+                    return result
+                elif kind == _STRUCT:
+                    raise ValueError(f"Struct end not found")
+                raise struct.error("unpack_from requires more data")
+
+            jce_id, type_, head_length = decode_head(jce_byte, offset)
+            if unknown is not None and type_ != 11 and jce_id not in node:
+                end = skip_field(jce_byte, type_, offset + head_length)
+                if end > length:
+                    raise ValueError("Unexpected end of data")
+                if unknown != "skip":
+                    unknown.append((jce_id, bytes(jce_byte[offset:end])))
+                offset = end
+                continue
+            offset += head_length
+            entry = current_plan.get(type_)
+            if entry is None:
+                raise ValueError(f"Unknown JceType for id {type_}")
+            decode_kind, unpacker, convert, jce_type = entry
+            child_extra = with_extra and kind != _STRUCT
+
+            if decode_kind == _FIXED:
+                value = unpacker.unpack_from(jce_byte, offset)[0]
+                offset += unpacker.size
+            elif decode_kind == _STRING:
+                size = unpacker.unpack_from(jce_byte, offset)[0]
+                offset += unpacker.size
+                # declared type of this value, for lazy strings
+                if node is None or convert is not None:
+                    child = None
+                elif kind == _LIST:
+                    child = node
+                elif kind == _MAP:
+                    child = node[0] if key is _empty else node[1]
+                else:
+                    field = node.get(jce_id)
+                    child = None if field is None else field[1]
+                if isinstance(child, tuple) and child[0] == _STRING:
+                    value = child[1](data=jce_byte[offset : offset + size])
+                else:
+                    value = str(jce_byte[offset : offset + size], "utf-8")
+                    if dedup is not None and size <= dedup.max_size:
+                        value = dedup._share_string(value)
+                offset += size
+            elif decode_kind == _BYTES:
+                size, offset = decode_int(jce_byte, offset + 1)
+                value = jce_byte[offset : offset + size]
+                offset += size
+            elif decode_kind == _ZERO:
+                value = bytes(1)
+            elif decode_kind == _END:
+                value = None
+            elif decode_kind == _CUSTOM:
+                value, data_length = jce_type.from_bytes(
+                    jce_byte[offset:], **(extra if child_extra else {})
+                )
+                offset += data_length
+            else:
+                body_start = offset
+                # declared type of this value
+                if node is None:
+                    child = None
+                elif kind == _LIST:
+                    child = node
+                elif kind == _MAP:
+                    child = node[0] if key is _empty else node[1]
+                else:
+                    field = node.get(jce_id)
+                    child = None if field is None else field[1]
+                # lazy maps are kept as encoded
+                lazy = (
+                    decode_kind == _MAP
+                    and convert is None
+                    and isinstance(child, tuple)
+                    and child[0] == _LAZY_MAP
+                )
+                if lazy:
+                    value, offset = child[1](jce_byte, offset)
+                    count = 0
+                elif decode_kind == _STRUCT:
+                    count = -1
+                else:
+                    count, offset = decode_int(jce_byte, offset)
+                if count > 0 or decode_kind == _STRUCT:
+                    if len(stack) >= max_depth:
+                        raise ValueError(
+                            f"Max nesting depth {max_depth} exceeded"
+                        )
+                    stack.append(
+                        (
+                            kind,
+                            items,
+                            container_type,
+                            remaining,
+                            key,
+                            container_id,
+                            with_extra,
+                            current_plan,
+                            node,
+                            target,
+                            unknown,
+                            start,
+                        )
+                    )
+                    node, target, unknown = None, None, None
+                    if child is None or convert is not None:
+                        pass
+                    elif decode_kind == _STRUCT:
+                        if isinstance(child, type):
+                            struct_schema = _struct_schema(child)
+                            if struct_schema is not None:
+                                node, target = struct_schema[0], child
+                                unknown = _unknown_spans(struct_schema[2])
+                    elif isinstance(child, tuple) and decode_kind == child[0]:
+                        node = child[1] if decode_kind == _LIST else child[1:]
+                    kind, container_type = decode_kind, convert
+                    items = [] if decode_kind == _LIST else {}
+                    remaining = count
+                    key, container_id = _empty, jce_id
+                    with_extra, current_plan = child_extra, nested_plan
+                    start = body_start
+                    continue
+                elif not lazy:
+                    value = [] if decode_kind == _LIST else {}
+
+            if convert is not None:
+                value = convert(value)
+
+            # add the value to its container, closing finished containers
+            while True:
+                if kind == _TOP:
+                    items[jce_id] = value
+                    break
+                elif kind == _STRUCT:
+                    if value is not None:
+                        if target is None:
+                            items[jce_id] = value
+                        else:
+                            field = node.get(jce_id)
+                            if field is not None:
+                                items[field[0]] = value
+                        break
+                    if target is not None:
+                        items = _build_struct(
+                            target, items, extra if with_extra else None
+                        )
+                        if unknown and unknown != "skip":
+                            _set_unknown(items, unknown)
+                    elif with_extra:
+                        items.update(extra)
+                elif kind == _LIST:
+                    items.append(value)
+                    remaining -= 1
+                    if remaining:
+                        break
+                elif key is _empty:
+                    key = value
+                    break
+                else:
+                    items[key] = value
+                    key = _empty
+                    remaining -= 1
+                    if remaining:
+                        break
+
+                value = items
+                if container_type is not None:
+                    value = container_type(items)
+                if (
+                    dedup is not None
+                    and offset - start <= dedup.max_size
+                    # the extra values may differ between decodes
+                    and not (with_extra and extra)
+                ):
+                    value = dedup._share(
+                        (kind, target, container_type, jce_byte[start:offset]),
+                        value,
+                    )
+                jce_id = container_id
+                (
+                    kind,
+                    items,
+                    container_type,
+                    remaining,
+                    key,
+                    container_id,
+                    with_extra,
+                    current_plan,
+                    node,
+                    target,
+                    unknown,
+                    start,
+                ) = stack.pop()
+
     @classmethod
     def decode(
         cls,
@@ -221,8 +963,17 @@ class JceDecoder:
         **extra,
     ) -> S:
         default_type = jce_struct.__jce_default_type__
-        jce_dict = cls.decode_bytes(data, default_type, **extra)
-        return cls.from_jce_dict(jce_struct, fields, jce_dict, **extra)
+        schema = (
+            _struct_schema(jce_struct)
+            if fields is jce_struct.__jce_fields__
+            else None
+        )
+        jce_dict = cls._decode_raw(data, default_type, extra, schema)
+        unknown = jce_dict.pop(_UNKNOWN, None)  # type: ignore
+        result = cls.from_jce_dict(jce_struct, fields, jce_dict, **extra)
+        if unknown:
+            _set_unknown(result, unknown)
+        return result
 
     @classmethod
     def from_jce_dict(
@@ -442,7 +1193,10 @@ class STRING(JceType, str):
 
     @classmethod
     def to_bytes(cls, jce_id: int, value: str) -> bytes:
-        byte = value.encode()
+        return cls._encoded_to_bytes(jce_id, value.encode())
+
+    @classmethod
+    def _encoded_to_bytes(cls, jce_id: int, byte: bytes) -> bytes:
         if len(byte) < 256:
             return (
                 cls.head_byte(jce_id, cls.__jce_type__[0])
@@ -482,17 +1236,118 @@ class STRING4(STRING):
         return data[4 : length + 4].decode(), length + 4
 
 
+class LAZY_STRING(JceType):
+    # STRING kept as its utf-8 bytes, decoded when value is first accessed.
+    # Encoding writes the bytes back as they are. Struct fields get the
+    # bytes without decoding them, other values are decoded first.
+    # Subclass to change the settings.
+    __jce_type__ = (6, 7)
+
+    # error handler for decoding, e.g. "replace" or "surrogateescape"
+    errors: str = "strict"
+
+    def __init__(
+        self, value: Optional[str] = None, *, data: Optional[bytes] = None
+    ):
+        if value is None and data is None:
+            raise ValueError("Either value or data is required")
+        self._value = value
+        self._data = data
+
+    def __repr__(self) -> str:
+        if self._value is None:
+            return f"{self.__class__.__name__}(<{len(self._data)} bytes>)"
+        return f"{self.__class__.__name__}({self._value!r})"
+
+    def __str__(self) -> str:
+        return self.value
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, str):
+            return self.value == other
+        elif not isinstance(other, LAZY_STRING):
+            return NotImplemented
+        elif self._data is not None and self._data == other._data:
+            return True
+        return self.value == other.value
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            self._value = str(self._data, "utf-8", self.errors)
+        return self._value
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = self._value.encode("utf-8", self.errors)  # type: ignore
+        return self._data
+
+    @classmethod
+    def to_bytes(cls, jce_id: int, value: Any) -> bytes:
+        data = (
+            value.data
+            if isinstance(value, LAZY_STRING)
+            else cls.validate(value).data
+        )
+        return STRING._encoded_to_bytes(jce_id, data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **extra) -> Tuple[str, int]:
+        raise NotImplementedError
+
+    @classmethod
+    def validate(cls, v):
+        if isinstance(v, LAZY_STRING):
+            if isinstance(v, cls):
+                return v
+            return cls(v._value, data=v._data)
+        elif isinstance(v, str):
+            return cls(v)
+        elif isinstance(v, (bytes, bytearray, memoryview)):
+            return cls(data=bytes(v))
+        raise TypeError(f"Invalid value type: {type(v)}")
+
+
 class MAP(JceType, Dict[T, VT]):
     __jce_type__ = (8,)
 
     @classmethod
-    def to_bytes(cls, jce_id: int, value: Dict[T, VT]) -> bytes:
-        byte = cls.head_byte(jce_id, cls.__jce_type__[0]) + INT.to_bytes(
+    def to_bytes(
+        cls, jce_id: int, value: Dict[T, VT], jce_args: Tuple[Any, ...] = ()
+    ) -> bytes:
+        return b"".join(cls._iter_bytes(jce_id, value, jce_args))
+
+    @classmethod
+    def _iter_bytes(
+        cls, jce_id: int, value: Dict[T, VT], jce_args: Tuple[Any, ...] = ()
+    ) -> Iterator[bytes]:
+        # the head, then one piece per item. With the declared (key, value)
+        # types plain python items are encoded without wrapping them first.
+        yield cls.head_byte(jce_id, cls.__jce_type__[0]) + INT.to_bytes(
             0, len(value)
         )
+        key_to_bytes = value_to_bytes = None
+        if len(jce_args) == 2:
+            key_to_bytes = _item_encoder(jce_args[0])
+            value_to_bytes = _item_encoder(jce_args[1])
+        if key_to_bytes is None or value_to_bytes is None:
+            for k, v in value.items():
+                yield (
+                    _encode_item(0, k)
+                    if key_to_bytes is None
+                    else key_to_bytes(0, k)
+                ) + (
+                    _encode_item(1, v)
+                    if value_to_bytes is None
+                    else value_to_bytes(1, v)
+                )
+            return
         for k, v in value.items():
-            byte += k.to_bytes(0, k) + v.to_bytes(1, v)
-        return byte
+            yield key_to_bytes(0, k) + value_to_bytes(1, v)
 
     @classmethod
     def from_bytes(cls, data: bytes, **extra) -> Tuple[dict, int]:
@@ -547,6 +1402,202 @@ class MAP(JceType, Dict[T, VT]):
         return new_instance
 
 
+class LAZY_MAP(JceType, Generic[T, VT]):
+    # MAP kept encoded with an index of its keys and the offsets of their
+    # values, found by skipping the values. A value is only decoded when it
+    # is looked up. Keys are plain python values, values are validated by
+    # their declared type. Encoding writes the bytes back as they are.
+    # Struct fields are indexed while decoding, maps decoded without a
+    # struct arrive as dicts. Read only, copy it into a dict to change it.
+    __jce_type__ = (8,)
+
+    def __init__(
+        self,
+        value: Optional[Mapping[Any, Any]] = None,
+        *,
+        data: Optional[bytes] = None,
+        jce_args: Tuple[Any, ...] = (),
+    ):
+        if value is None and data is None:
+            raise ValueError("Either value or data is required")
+        # data is the body after the head, the count and the entries
+        self._data = data
+        self._jce_args = jce_args
+        # decoded values and, once indexed, key -> (start, end) of the
+        # encoded values
+        self._values: Dict[Any, Any] = {} if value is None else dict(value)
+        self._index: Optional[Dict[Any, Tuple[int, int]]] = None
+
+    def __repr__(self) -> str:
+        if self._data is None:
+            return f"{self.__class__.__name__}({self._values!r})"
+        return f"{self.__class__.__name__}(<{len(self)} items>)"
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            if self._data is None:
+                raise
+        start, end = self._keys()[key]
+        value = self._values[key] = self._decode_value(start, end)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._keys()
+
+    def __len__(self) -> int:
+        if self._data is None:
+            return len(self._values)
+        elif self._index is None:
+            return self.__jce_decoder__.decode_int(self._data)[0]
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._keys())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LAZY_MAP):
+            if self._data is not None and self._data == other._data:
+                return True
+            other = dict(other.items())
+        elif not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == other
+
+    __hash__ = None  # type: ignore
+
+    def keys(self) -> Iterable[Any]:
+        return self._keys().keys()
+
+    def values(self) -> Iterator[Any]:
+        return (self[key] for key in self._keys())
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        return ((key, self[key]) for key in self._keys())
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            return MAP.to_bytes(0, self._values, self._jce_args)[1:]
+        return self._data
+
+    def _item_type(
+        self, index: int
+    ) -> Tuple[Optional[Type[JceType]], Tuple[Any, ...]]:
+        if len(self._jce_args) != 2:
+            return None, ()
+        return resolve_jce_type(self._jce_args[index])
+
+    def _keys(self) -> Mapping[Any, Any]:
+        if self._data is None:
+            return self._values
+        elif self._index is None:
+            self._index, _ = self._build_index(self._data)
+        return self._index
+
+    def _build_index(
+        self, data: bytes, offset: int = 0
+    ) -> Tuple[Dict[Any, Tuple[int, int]], int]:
+        # key -> (start, end) of the encoded value relative to offset, and
+        # the offset after the map
+        decoder = self.__jce_decoder__
+        decode_head = decoder.decode_head
+        skip_field = decoder.skip_field
+        key_type, key_args = self._item_type(0)
+        base = offset
+        count, offset = decoder.decode_int(data, offset)
+        index: Dict[Any, Tuple[int, int]] = {}
+        for _ in range(count):
+            start = offset
+            _, type_, head_length = decode_head(data, offset)
+            offset = skip_field(data, type_, offset + head_length)
+            # integer and string keys are read inline
+            if 1 <= type_ <= 3:
+                key = struct.unpack_from(
+                    _INT_FORMAT[type_], data, start + head_length
+                )[0]
+            elif type_ == 6 or type_ == 7:
+                size = 1 if type_ == 6 else 4
+                key = str(data[start + head_length + size : offset], "utf-8")
+            else:
+                key = decoder._decode_raw(data[start:offset], None, {})[0]
+                if key_type is not None:
+                    key = _native_value(key, key_type, key_args)
+            _, type_, head_length = decode_head(data, offset)
+            start = offset
+            offset = skip_field(data, type_, offset + head_length)
+            index[key] = (start - base, offset - base)
+        return index, offset
+
+    @classmethod
+    def _decode_at(
+        cls, jce_args: Tuple[Any, ...], data: bytes, offset: int
+    ) -> Tuple["LAZY_MAP", int]:
+        # the map whose head ends at offset, indexed right away
+        value = cls(data=b"", jce_args=jce_args)
+        value._index, end = value._build_index(data, offset)
+        value._data = bytes(data[offset:end])
+        return value, end
+
+    def _decode_value(self, start: int, end: int) -> Any:
+        decoder = self.__jce_decoder__
+        data = self._data[start:end]  # type: ignore
+        value_type, value_args = self._item_type(1)
+        if value_type is None:
+            return decoder.decode_bytes(data)[1]
+        # structs are built by name, like in the fields of a struct
+        node = _schema_node(value_type, value_args)
+        schema = None if node is None else ({1: ("", node, None)}, (), None)
+        value = decoder._decode_raw(data, None, {}, schema)[1]
+        return parse_obj_as(self._jce_args[1], value)
+
+    @classmethod
+    def to_bytes(cls, jce_id: int, value: Any) -> bytes:
+        if not isinstance(value, LAZY_MAP):
+            value = cls.validate(value)
+        return cls.head_byte(jce_id, cls.__jce_type__[0]) + value.data
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **extra) -> Tuple["LAZY_MAP", int]:
+        data_length = cls.__jce_decoder__.skip_field(data, 8)
+        return cls(data=bytes(data[:data_length])), data_length
+
+    @classmethod
+    def validate(cls, v, field: Optional[ModelField] = None):
+        jce_args = (
+            tuple(sub_field.outer_type_ for sub_field in field.sub_fields)
+            if field is not None and field.sub_fields
+            else ()
+        )
+        if isinstance(v, LAZY_MAP):
+            if isinstance(v, cls) and (v._jce_args or not jce_args):
+                return v
+            jce_args = jce_args or v._jce_args
+            if v._data is None:
+                return cls._from_mapping(v._values, jce_args)
+            return cls(data=v._data, jce_args=jce_args)
+        elif isinstance(v, (bytes, bytearray, memoryview)):
+            return cls(data=bytes(v), jce_args=jce_args)
+        elif isinstance(v, Mapping):
+            return cls._from_mapping(v, jce_args)
+        raise TypeError(f"Invalid LAZY_MAP type: {type(v)}")
+
+    @classmethod
+    def _from_mapping(
+        cls, v: Mapping[Any, Any], jce_args: Tuple[Any, ...]
+    ) -> "LAZY_MAP":
+        if len(jce_args) != 2:
+            return cls(MAP.validate(v))
+        return cls(parse_obj_as(MAP[jce_args], v), jce_args=jce_args)
+
+
 class LIST(JceType, List[T]):
     __jce_type__ = (9,)
 
@@ -562,13 +1613,26 @@ class LIST(JceType, List[T]):
     #     return super().__getitem__(index)
 
     @classmethod
-    def to_bytes(cls, jce_id: int, value: List[T]) -> bytes:
-        byte = cls.head_byte(jce_id, cls.__jce_type__[0]) + INT32.to_bytes(
+    def to_bytes(
+        cls, jce_id: int, value: List[T], jce_args: Tuple[Any, ...] = ()
+    ) -> bytes:
+        return b"".join(cls._iter_bytes(jce_id, value, jce_args))
+
+    @classmethod
+    def _iter_bytes(
+        cls, jce_id: int, value: List[T], jce_args: Tuple[Any, ...] = ()
+    ) -> Iterator[bytes]:
+        # the head, then one piece per item, see MAP._iter_bytes
+        yield cls.head_byte(jce_id, cls.__jce_type__[0]) + INT32.to_bytes(
             0, len(value)
         )
+        to_bytes = _item_encoder(jce_args[0]) if len(jce_args) == 1 else None
+        if to_bytes is None:
+            for v in value:
+                yield _encode_item(0, v)
+            return
         for v in value:
-            byte += v.to_bytes(0, v)
-        return byte
+            yield to_bytes(0, v)
 
     @classmethod
     def from_bytes(cls, data: bytes, **extra) -> Tuple[List[T], int]:
@@ -586,7 +1650,7 @@ class LIST(JceType, List[T]):
         return result, data_length
 
     @classmethod
-    def validate(cls, v):
+    def validate(cls, v, field: Optional[ModelField] = None):
         if isinstance(v, cls):
             return v
 
@@ -595,6 +1659,10 @@ class LIST(JceType, List[T]):
         elif not isinstance(v, Iterable):
             raise TypeError(f"Invalid LIST type: {type(v)}")
 
+        if field is not None and field.sub_fields:
+            # LIST[T] field, pydantic validates every item as T next
+            return v if isinstance(v, list) else list(v)
+
         new_instance = cls()
         for item in v:
             if not isinstance(item, JceType):
@@ -658,11 +1726,15 @@ class BYTES(JceType, bytes):
 
     @classmethod
     def to_bytes(cls, jce_id: int, value: bytes) -> bytes:
+        return cls._head(jce_id, len(value)) + value
+
+    @classmethod
+    def _head(cls, jce_id: int, length: int) -> bytes:
+        # everything before the value
         return (
             cls.head_byte(jce_id, cls.__jce_type__[0])
             + cls.head_byte(0, 0)
-            + INT32.to_bytes(0, len(value))
-            + value
+            + INT32.to_bytes(0, length)
         )
 
     @classmethod
@@ -684,48 +1756,128 @@ class BYTES(JceType, bytes):
         return v
 
 
+DEFAULT_JCE_TYPE: Mapping[int, Type[JceType]] = MappingProxyType(
+    {
+        0: BYTE,
+        1: INT16,
+        2: INT32,
+        3: INT64,
+        4: FLOAT,
+        5: DOUBLE,
+        6: STRING1,
+        7: STRING4,
+        8: MAP,
+        9: LIST,
+        10: STRUCT_START,
+        11: STRUCT_END,
+        12: ZERO_TAG,
+        13: BYTES,
+    }
+)
+
+
+_NATIVE_DECODE: Tuple[Tuple[Type[JceType], int, Optional[struct.Struct]], ...]
+_NATIVE_DECODE = (
+    (BYTE, _FIXED, struct.Struct(">c")),
+    (BOOL, _FIXED, struct.Struct(">?")),
+    (INT8, _FIXED, struct.Struct(">b")),
+    (INT16, _FIXED, struct.Struct(">h")),
+    (INT32, _FIXED, struct.Struct(">i")),
+    (INT64, _FIXED, struct.Struct(">q")),
+    (FLOAT, _FIXED, struct.Struct(">f")),
+    (DOUBLE, _FIXED, struct.Struct(">d")),
+    (STRING1, _STRING, struct.Struct(">B")),
+    (STRING4, _STRING, struct.Struct(">I")),
+    (BYTES, _BYTES, None),
+    (ZERO_TAG, _ZERO, None),
+    (STRUCT_END, _END, None),
+    (STRUCT_START, _STRUCT, None),
+    (LIST, _LIST, None),
+    (MAP, _MAP, None),
+)
+
+
+def _build_decode_plan(
+    default_types: Mapping[int, Type[JceType]], validate: bool = True
+) -> Dict[int, Tuple[int, Optional[struct.Struct], Any, Type[JceType]]]:
+    # head type -> (kind, unpacker, converter, jce type)
+    # types using a builtin from_bytes are decoded inline, the converter
+    # replaces validate where it is known to just call the constructor.
+    # Without validate only custom validate methods are kept.
+    plan = {}
+    for type_, jce_type in default_types.items():
+        from_bytes = jce_type.from_bytes.__func__  # type: ignore
+        for native, kind, unpacker in _NATIVE_DECODE:
+            if from_bytes is native.from_bytes.__func__:  # type: ignore
+                break
+        else:
+            plan[type_] = (_CUSTOM, None, jce_type.validate, jce_type)
+            continue
+        custom = (
+            jce_type.validate.__func__  # type: ignore
+            is not native.validate.__func__  # type: ignore
+        )
+        if custom or (validate and kind in (_STRUCT, _LIST, _MAP)):
+            # containers are converted when they are closed
+            convert = jce_type.validate
+        elif not validate or kind in (_ZERO, _END):
+            convert = None
+        else:
+            convert = jce_type
+        plan[type_] = (kind, unpacker, convert, jce_type)
+    return plan
+
+
+# Module level tables are built once and never mutated, the codec keeps
+# no other shared state and may be used from several threads at once.
+_DEFAULT_DECODE_PLAN = _build_decode_plan(DEFAULT_JCE_TYPE)
+_DEFAULT_RAW_DECODE_PLAN = _build_decode_plan(DEFAULT_JCE_TYPE, False)
+
+
+def _decode_plan(
+    default_types: Mapping[int, Type[JceType]], validate: bool = True
+) -> Dict[int, Tuple[int, Optional[struct.Struct], Any, Type[JceType]]]:
+    if default_types is DEFAULT_JCE_TYPE:
+        return _DEFAULT_DECODE_PLAN if validate else _DEFAULT_RAW_DECODE_PLAN
+    return _build_decode_plan(default_types, validate)
+
+
+class _lazy_jce_fields:
+    def __get__(self, instance, owner) -> Dict[str, JceModelField]:
+        fields = prepare_fields(
+            owner.__fields__,
+            getattr(owner.__config__, "jce_omit_default", False),
+        )
+        # replace the descriptor, later lookups hit the class dict directly.
+        # Threads racing here build equal fields, any of them may win.
+        setattr(owner, "__jce_fields__", fields)
+        return fields
+
+
 class JceMetaclass(ModelMetaclass):
     def __new__(mcs, name, bases, namespace):  # type: ignore
         config = namespace.get("Config", object())
         Encoder = getattr(config, "jce_encoder", JceEncoder)
         Decoder = getattr(config, "jce_decoder", JceDecoder)
-        default_type = getattr(
-            config,
-            "jce_default_type",
-            {
-                0: BYTE,
-                1: INT16,
-                2: INT32,
-                3: INT64,
-                4: FLOAT,
-                5: DOUBLE,
-                6: STRING1,
-                7: STRING4,
-                8: MAP,
-                9: LIST,
-                10: STRUCT_START,
-                11: STRUCT_END,
-                12: ZERO_TAG,
-                13: BYTES,
-            },
-        )
+        default_type = getattr(config, "jce_default_type", DEFAULT_JCE_TYPE)
         if Encoder is not JceEncoder and not issubclass(Encoder, JceEncoder):
             raise TypeError(f"Encoder {Encoder} is not a valid encoder")
         if Decoder is not JceDecoder and not issubclass(Decoder, JceDecoder):
             raise TypeError(f"Decoder {Decoder} is not a valid decoder")
-        if any(not issubclass(x, JceType) for x in default_type.values()):
-            raise TypeError(f'Invalid default jce type in struct "{name}"')
+        if default_type is not DEFAULT_JCE_TYPE:
+            if any(not issubclass(x, JceType) for x in default_type.values()):
+                raise TypeError(f'Invalid default jce type in struct "{name}"')
+            # private read-only copy, shared by every decoding thread
+            default_type = MappingProxyType(dict(default_type))
         namespace.update(
             {
                 "__jce_encoder__": Encoder,
                 "__jce_decoder__": Decoder,
                 "__jce_default_type__": default_type,
+                "__jce_fields__": _lazy_jce_fields(),
             }
         )
-        cls = super().__new__(mcs, name, bases, namespace)  # type: ignore
-        fields = prepare_fields(cls.__fields__)
-        setattr(cls, "__jce_fields__", fields)
-        return cls
+        return super().__new__(mcs, name, bases, namespace)  # type: ignore
 
 
 class JceStruct(JceType, BaseModel, metaclass=JceMetaclass):
@@ -734,14 +1886,60 @@ class JceStruct(JceType, BaseModel, metaclass=JceMetaclass):
         __jce_encoder__: Type[JceEncoder]
         __jce_decoder__: Type[JceDecoder]
         __jce_fields__: Dict[str, JceModelField]
-        __jce_default_type__: Dict[int, Type[JceType]]
+        __jce_default_type__: Mapping[int, Type[JceType]]
+
+    # (jce_id, encoded field) of the tags kept with Config.jce_unknown_tags
+    __jce_unknown__: Optional[Tuple[Tuple[int, bytes], ...]] = PrivateAttr(None)
+
+    class Config:
+        # merged with the json_encoders of subclass configs
+        json_encoders = {
+            LAZY_STRING: lambda v: v.value,
+            LAZY_MAP: lambda v: dict(v.items()),
+        }
 
     def __getitem__(self, key):
         return getattr(self, key)
 
+    def __reduce_ex__(self, protocol):
+        # with Config.jce_pickle, pickle as the encoded bytes plus the
+        # values of the non JCE fields
+        if not getattr(
+            self.__config__, "jce_pickle", False
+        ) or not _jce_picklable(type(self)):
+            return super().__reduce_ex__(protocol)
+        jce_fields = self.__jce_fields__
+        extra = {
+            name: getattr(self, name)
+            for name in self.__fields__
+            if name not in jce_fields
+        }
+        return _unpickle_struct, (type(self), self.encode(), extra)
+
     def encode(self) -> bytes:
         return self.__jce_encoder__.encode(self.__jce_fields__, self)
 
+    async def encode_async(
+        self,
+        *,
+        chunk_size: int = 1000,
+        executor_threshold: Optional[int] = None,
+        executor: Optional["Executor"] = None,
+    ) -> bytes:
+        # asyncio is only imported when it is used
+        from .aio import encode_async
+
+        return await encode_async(
+            self, chunk_size, executor_threshold, executor
+        )
+
+    def encode_iov(
+        self, *, threshold: int = 4096
+    ) -> List[Union[bytes, memoryview]]:
+        # the encoded bytes as a list of buffers for socket.sendmsg or
+        # writelines, BYTES values of threshold bytes and more are not copied
+        return _encode_iov(self, threshold)
+
     @classmethod
     def to_bytes(cls: Type[S], jce_id: int, value: S) -> bytes:
         return (
@@ -756,18 +1954,115 @@ class JceStruct(JceType, BaseModel, metaclass=JceMetaclass):
             cls, cls.__jce_fields__, data, **extra
         )
 
+    @classmethod
+    async def decode_async(
+        cls: Type[S],
+        data: bytes,
+        *,
+        chunk_size: int = 1000,
+        executor_threshold: Optional[int] = None,
+        executor: Optional["Executor"] = None,
+        **extra,
+    ) -> S:
+        from .aio import decode_async
+
+        return await decode_async(
+            cls, data, extra, chunk_size, executor_threshold, executor
+        )
+
+    @classmethod
+    def decode_native(
+        cls, data: bytes, *, dedup: Optional["Dedup"] = None, **extra
+    ) -> Dict[str, Any]:
+        # plain python values keyed by field name, converted only where the
+        # field type needs it, e.g. a BYTE head for an INT64 field
+        jce_dict = cls.__jce_decoder__.decode_bytes(
+            data, cls.__jce_default_type__, native=True, dedup=dedup, **extra
+        )
+        # values shared through dedup stay shared after the conversion
+        result = _native_struct(cls, jce_dict, None if dedup is None else {})
+        result.update(extra)
+        return result
+
+    @classmethod
+    def decode_columns(
+        cls, payloads: Iterable[bytes], *, numpy: bool = False
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # (columns, missing) keyed by field name, see decode_native for the
+        # values. Missing tags are None in the column and True in missing.
+        from .columns import decode_columns
+
+        return decode_columns(cls, payloads, numpy)
+
     @classmethod
     def decode_list(cls: Type[S], data: bytes, jce_id: int, **extra) -> List[S]:
-        decoded = cls.__jce_decoder__.decode_bytes(data)
+        schema = cls._field_schema(jce_id, _schema_node(LIST, (cls,)))
+        decoded = cls.__jce_decoder__._decode_raw(
+            data, None, extra if schema else {}, schema
+        )
         result_list = decoded.get(jce_id)
         if not isinstance(result_list, list):
             raise TypeError(f"Value at jce_id {jce_id} is not a list")
         for index in range(len(result_list)):
-            result_list[index] = cls.__jce_decoder__.from_jce_dict(
-                cls, cls.__jce_fields__, result_list[index], **extra
+            result_list[index] = cls._list_item(
+                result_list[index], schema, extra
             )
         return result_list
 
+    @classmethod
+    def iter_list(
+        cls: Type[S],
+        source: Union[bytes, bytearray, memoryview, mmap.mmap, BinaryIO],
+        jce_id: int,
+        **extra,
+    ) -> Iterator[S]:
+        # Like decode_list, but other fields are skipped and the items are
+        # decoded one at a time. A file-like source is read as needed.
+        decoder = cls.__jce_decoder__
+        node = _schema_node(cls, ())
+        schemas: Dict[int, Optional[_Schema]] = {}
+        for item_id, item in _iter_list_items(source, jce_id, decoder):
+            if item_id not in schemas:
+                schemas[item_id] = cls._field_schema(item_id, node)
+            schema = schemas[item_id]
+            decoded = decoder._decode_raw(
+                item, None, extra if schema else {}, schema
+            )
+            yield cls._list_item(decoded[item_id], schema, extra)
+
+    @classmethod
+    def _field_schema(cls, jce_id: int, node: Any) -> Optional[_Schema]:
+        # schema of a single field holding node, None if the items are left
+        # to from_jce_dict
+        decoder = cls.__jce_decoder__
+        from_jce_dict = JceDecoder.from_jce_dict.__func__  # type: ignore
+        if (
+            node is None
+            or not decoder._uses_stack()
+            or decoder.from_jce_dict.__func__ is not from_jce_dict  # type: ignore
+        ):
+            return None
+        return ({jce_id: ("", node, None)}, (), None)
+
+    @classmethod
+    def _list_item(
+        cls: Type[S],
+        item: Any,
+        schema: Optional[_Schema],
+        extra: Dict[str, Any],
+    ) -> S:
+        if isinstance(item, cls):
+            if extra:
+                # extra values override the decoded ones like from_jce_dict
+                return cls.parse_obj({**dict(item), **extra})
+            return item
+        elif schema is not None:
+            # collected by field name but invalid, raises the error
+            return cls.parse_obj(item)
+        return cls.__jce_decoder__.from_jce_dict(
+            cls, cls.__jce_fields__, item, **extra
+        )
+
     @classmethod
     def from_bytes(cls, data: bytes, **extra) -> Tuple[Dict[int, JceType], int]:
         offset = 0
@@ -804,7 +2099,11 @@ class JceStruct(JceType, BaseModel, metaclass=JceMetaclass):
                     data = v.get(field_name, _empty)
                 if data is _empty:
                     continue
-                values[field_name] = jce_info.jce_type.validate(data)
+                # the field validates everything else when parsing, None
+                # is checked here as optional fields would accept it
+                if data is None or jce_info.pre_validate:
+                    data = jce_info.jce_type.validate(data)
+                values[field_name] = data
             else:
                 data = v.get(field_name, _empty)
                 if data is _empty:
@@ -813,21 +2112,464 @@ class JceStruct(JceType, BaseModel, metaclass=JceMetaclass):
         return cls.parse_obj(values)
 
 
+# zlib streams can't start with it, their first byte is 0x?8
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _zstd() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd compression requires the zstandard package"
+        ) from None
+    return zstandard
+
+
+def _decompress(data: bytes, max_size: int) -> bytes:
+    # corrupt bodies and bodies over max_size raise ValueError
+    if data[:4] == _ZSTD_MAGIC:
+        zstd = _zstd()
+        reader = zstd.ZstdDecompressor().stream_reader(data)
+        chunks: List[bytes] = []
+        size = 0
+        try:
+            while True:
+                chunk = reader.read(65536)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError(
+                        f"Decompressed body exceeds {max_size} bytes"
+                    )
+                chunks.append(chunk)
+        except zstd.ZstdError as e:
+            raise ValueError(f"Invalid zstd compressed body: {e}") from None
+        return b"".join(chunks)
+    decompressor = zlib.decompressobj()
+    try:
+        result = decompressor.decompress(data, max_size + 1)
+    except zlib.error as e:
+        raise ValueError(f"Invalid zlib compressed body: {e}") from None
+    if len(result) > max_size:
+        raise ValueError(f"Decompressed body exceeds {max_size} bytes")
+    elif not decompressor.eof or decompressor.unused_data:
+        raise ValueError(
+            "Invalid zlib compressed body: truncated or trailing data"
+        )
+    return result
+
+
+def _jce_picklable(jce_struct: Type[JceStruct]) -> bool:
+    # Nested structs are rebuilt from the encoding alone, so their
+    # declared types must not have non JCE fields. Cached on the class.
+    try:
+        return jce_struct.__dict__["__jce_picklable__"]
+    except KeyError:
+        pass
+    seen = {jce_struct}
+    annotations = [
+        (field.jce_type, field.jce_args)
+        for field in jce_struct.__jce_fields__.values()
+    ]
+    picklable = True
+    while annotations and picklable:
+        jce_type, jce_args = annotations.pop()
+        annotations.extend(resolve_jce_type(arg) for arg in jce_args)
+        if (
+            jce_type is None
+            or not issubclass(jce_type, JceStruct)
+            or jce_type in seen
+        ):
+            continue
+        seen.add(jce_type)
+        picklable = len(jce_type.__fields__) == len(jce_type.__jce_fields__)
+        annotations.extend(
+            (field.jce_type, field.jce_args)
+            for field in jce_type.__jce_fields__.values()
+        )
+    setattr(jce_struct, "__jce_picklable__", picklable)
+    return picklable
+
+
+def _unpickle_struct(
+    jce_struct: Type[S], data: bytes, extra: Dict[str, Any]
+) -> S:
+    return jce_struct.decode(data, **extra)
+
+
+def _custom_encoding(value: JceStruct) -> bool:
+    # also true for structs with preserved unknown tags, encode merges them
+    encoder = value.__jce_encoder__
+    return (
+        getattr(value, "__jce_unknown__", None) is not None
+        or type(value).encode is not JceStruct.encode
+        or encoder.encode.__func__ is not JceEncoder.encode.__func__
+        or encoder.encode_by_type is not JceEncoder.encode_by_type
+        or encoder.encode_by_value is not JceEncoder.encode_by_value
+    )
+
+
+def _iter_encoded(value: JceStruct) -> Iterator[bytes]:
+    # the encoded struct body in pieces, one per field and one per item of
+    # the top level LIST and MAP fields. Customized encoding is one piece.
+    if _custom_encoding(value):
+        yield value.encode()
+        return
+
+    for name, field in value.__jce_fields__.items():
+        jce_value = value[name]
+        if jce_value is None or (
+            field.omit_default and jce_value == field.default
+        ):
+            continue
+        jce_type = (
+            type(jce_value)
+            if isinstance(jce_value, JceType)
+            else field.jce_type
+        )
+        to_bytes = jce_type.to_bytes.__func__  # type: ignore
+        if (
+            to_bytes is not LIST.to_bytes.__func__  # type: ignore
+            and to_bytes is not MAP.to_bytes.__func__  # type: ignore
+        ):
+            yield jce_type.to_bytes(field.jce_id, jce_value)
+            continue
+        jce_args = field.jce_args if _typed_container(field) else ()
+        yield from jce_type._iter_bytes(  # type: ignore
+            field.jce_id, jce_value, jce_args
+        )
+
+
+class _Iov:
+    # encode_iov output: small pieces are packed into one buffer, large
+    # BYTES values are referenced as they are
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.buffer = bytearray()
+        self.pieces: List[Union[bytes, memoryview]] = []
+
+    def struct(self, value: JceStruct) -> None:
+        for name, field in value.__jce_fields__.items():
+            jce_value = value[name]
+            if jce_value is None or (
+                field.omit_default and jce_value == field.default
+            ):
+                continue
+            elif isinstance(jce_value, JceType):
+                self.value(field.jce_id, type(jce_value), jce_value, ())
+            elif _typed_container(field):
+                self.value(
+                    field.jce_id, field.jce_type, jce_value, field.jce_args
+                )
+            else:
+                self.value(field.jce_id, field.jce_type, jce_value, ())
+
+    def value(
+        self,
+        jce_id: int,
+        jce_type: Type[JceType],
+        value: Any,
+        jce_args: Tuple[Any, ...],
+    ) -> None:
+        to_bytes = jce_type.to_bytes.__func__  # type: ignore
+        if (
+            to_bytes is BYTES.to_bytes.__func__  # type: ignore
+            and len(value) >= self.threshold
+        ):
+            self.buffer += jce_type._head(jce_id, len(value))  # type: ignore
+            self.flush()
+            self.pieces.append(memoryview(value))
+        elif (
+            isinstance(value, JceStruct)
+            and to_bytes is JceStruct.to_bytes.__func__  # type: ignore
+            and not _custom_encoding(value)
+        ):
+            self.buffer += STRUCT_START.to_bytes(jce_id, None)
+            self.struct(value)
+            self.buffer += STRUCT_END.to_bytes(jce_id, None)
+        elif to_bytes is LIST.to_bytes.__func__:  # type: ignore
+            self.buffer += jce_type.head_byte(
+                jce_id, jce_type.__jce_type__[0]
+            ) + INT32.to_bytes(0, len(value))
+            item_type, item_args = (
+                resolve_jce_type(jce_args[0]) if jce_args else (None, ())
+            )
+            for item in value:
+                if isinstance(item, JceStruct) or (
+                    item_type is None and isinstance(item, JceType)
+                ):
+                    self.value(0, type(item), item, ())
+                elif item_type is None:
+                    self.buffer += _encode_item(0, item)
+                else:
+                    self.value(0, item_type, item, item_args)
+        elif jce_args:
+            self.buffer += jce_type.to_bytes(  # type: ignore
+                jce_id, value, jce_args
+            )
+        else:
+            self.buffer += jce_type.to_bytes(jce_id, value)
+
+    def flush(self) -> None:
+        if self.buffer:
+            self.pieces.append(bytes(self.buffer))
+            self.buffer = bytearray()
+
+
+def _encode_iov(
+    value: JceStruct, threshold: int
+) -> List[Union[bytes, memoryview]]:
+    if _custom_encoding(value):
+        return [value.encode()]
+    iov = _Iov(threshold)
+    iov.struct(value)
+    iov.flush()
+    return iov.pieces
+
+
+class COMPRESSED(JceType, Generic[S]):
+    # BYTES holding the zlib or zstd compressed body of a struct. Decoded
+    # values keep the compressed data and only decompress and decode it
+    # when value is first accessed. Subclass to change the settings.
+    __jce_type__ = (13,)
+
+    # "zlib" or "zstd" (requires zstandard), both are read on decode
+    codec: str = "zlib"
+    # compression level, None for the codec default
+    level: Optional[int] = None
+    # smaller bodies are stored uncompressed, as a zlib level 0 stream
+    threshold: int = 0
+    # larger decompressed bodies raise ValueError on decode
+    max_size: int = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        value: Optional[S] = None,
+        *,
+        data: Optional[bytes] = None,
+        struct: Optional[Type[S]] = None,
+    ):
+        if value is None and data is None:
+            raise ValueError("Either value or data is required")
+        self._value = value
+        self._data = data
+        self._struct = type(value) if struct is None else struct
+
+    def __repr__(self) -> str:
+        if self._value is None:
+            return f"{self.__class__.__name__}(<{len(self._data)} bytes>)"
+        return f"{self.__class__.__name__}({self._value!r})"
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, COMPRESSED):
+            return NotImplemented
+        elif self._value is None and other._value is None:
+            if self._data == other._data:
+                return True
+        return self.value == other.value
+
+    __hash__ = None  # type: ignore
+
+    @property
+    def value(self) -> S:
+        if self._value is None:
+            if self._struct is None:
+                raise TypeError("Struct type of the compressed value unknown")
+            # the compressed copy is not needed anymore
+            self._value = self._struct.decode(
+                _decompress(self._data, self.max_size)
+            )
+            self._data = None
+        return self._value
+
+    @property
+    def data(self) -> bytes:
+        # compressed again on every access once value may have changed
+        if self._value is None:
+            return self._data  # type: ignore
+        return self.compress(self._value)
+
+    @classmethod
+    def compress(cls, value: JceStruct) -> bytes:
+        # the body is fed to the compressor piece by piece
+        pieces = _iter_encoded(value)
+        head: List[bytes] = []
+        size = 0
+        for piece in pieces:
+            head.append(piece)
+            size += len(piece)
+            if size >= cls.threshold:
+                break
+        else:
+            return zlib.compress(b"".join(head), 0)
+
+        if cls.codec == "zstd":
+            level = 3 if cls.level is None else cls.level
+            compressor = _zstd().ZstdCompressor(level=level).compressobj()
+        elif cls.codec == "zlib":
+            level = -1 if cls.level is None else cls.level
+            compressor = zlib.compressobj(level)
+        else:
+            raise ValueError(f"Unknown compression codec: {cls.codec}")
+        result = [compressor.compress(piece) for piece in head]
+        result.extend(compressor.compress(piece) for piece in pieces)
+        result.append(compressor.flush())
+        return b"".join(result)
+
+    @classmethod
+    def to_bytes(cls, jce_id: int, value: Any) -> bytes:
+        data = (
+            value.data if isinstance(value, COMPRESSED) else cls.compress(value)
+        )
+        return BYTES.to_bytes(jce_id, data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **extra) -> Tuple[bytes, int]:
+        return BYTES.from_bytes(data, **extra)
+
+    @classmethod
+    def validate(cls, v, field: Optional[ModelField] = None):
+        jce_struct = (
+            field.sub_fields[0].outer_type_
+            if field is not None and field.sub_fields
+            else None
+        )
+        if isinstance(v, COMPRESSED):
+            if isinstance(v, cls) and (jce_struct is None or v._struct):
+                return v
+            return cls(v._value, data=v._data, struct=v._struct or jce_struct)
+        elif isinstance(v, (bytes, bytearray, memoryview)):
+            if jce_struct is None:
+                raise TypeError("Struct type of the compressed value unknown")
+            return cls(data=bytes(v), struct=jce_struct)
+        elif jce_struct is not None:
+            return cls(jce_struct.validate(v))
+        elif isinstance(v, JceStruct):
+            return cls(v)
+        raise TypeError(f"Invalid value type: {type(v)}")
+
+
+# COMPRESSED is defined after JceStruct, so it is registered afterwards
+JceStruct.__config__.json_encoders[COMPRESSED] = lambda v: v.value
+
+
+def _native_struct(
+    jce_struct: Type[JceStruct],
+    jce_dict: Dict[Any, Any],
+    memo: Optional[Dict[Any, Any]] = None,
+) -> Dict[str, Any]:
+    result = {}
+    for name, field in jce_struct.__jce_fields__.items():
+        value = jce_dict.get(field.jce_id, _empty)
+        if value is not _empty:
+            result[name] = _native_value(
+                value, field.jce_type, field.jce_args, memo
+            )
+        elif field.omit_default:
+            result[name] = jce_struct.__fields__[name].get_default()
+    # keys which are no tags, e.g. the extra values
+    result.update(
+        (key, value)
+        for key, value in jce_dict.items()
+        if not isinstance(key, int)
+    )
+    return result
+
+
+def _native_value(
+    value: Any,
+    jce_type: Optional[Type[JceType]],
+    jce_args: Tuple[Any, ...],
+    memo: Optional[Dict[Any, Any]] = None,
+) -> Any:
+    # memo maps containers already converted by id, so shared containers
+    # are converted once and stay shared
+    if memo is None or not isinstance(value, (list, dict)):
+        return _convert_native(value, jce_type, jce_args, memo)
+    key = (id(value), jce_type, jce_args)
+    result = memo.get(key, _empty)
+    if result is _empty:
+        result = memo[key] = _convert_native(value, jce_type, jce_args, memo)
+    return result
+
+
+def _convert_native(
+    value: Any,
+    jce_type: Optional[Type[JceType]],
+    jce_args: Tuple[Any, ...],
+    memo: Optional[Dict[Any, Any]],
+) -> Any:
+    if jce_type is None:
+        return value
+    elif issubclass(jce_type, JceStruct):
+        if isinstance(value, dict):
+            return _native_struct(jce_type, value, memo)
+    elif issubclass(jce_type, COMPRESSED):
+        jce_struct = jce_args[0] if len(jce_args) == 1 else None
+        if (
+            isinstance(value, bytes)
+            and isinstance(jce_struct, type)
+            and issubclass(jce_struct, JceStruct)
+        ):
+            return _native_struct(
+                jce_struct,
+                jce_struct.__jce_decoder__.decode_bytes(
+                    _decompress(value, jce_type.max_size),
+                    jce_struct.__jce_default_type__,
+                    native=True,
+                ),
+            )
+    elif issubclass(jce_type, LIST):
+        if isinstance(value, list) and len(jce_args) == 1:
+            item_type, item_args = resolve_jce_type(jce_args[0])
+            if item_type is not None:
+                return [
+                    _native_value(item, item_type, item_args, memo)
+                    for item in value
+                ]
+    elif issubclass(jce_type, (MAP, LAZY_MAP)):
+        if isinstance(value, dict) and len(jce_args) == 2:
+            key_type, key_args = resolve_jce_type(jce_args[0])
+            value_type, value_args = resolve_jce_type(jce_args[1])
+            return {
+                _native_value(k, key_type, key_args, memo): _native_value(
+                    v, value_type, value_args, memo
+                )
+                for k, v in value.items()
+            }
+    elif issubclass(jce_type, BOOL):
+        if isinstance(value, (bytes, int)):
+            return value not in (0, b"\x00")
+    elif isinstance(value, bytes):
+        # BYTE and ZERO_TAG heads hold small numbers of any type
+        if issubclass(jce_type, INT):
+            return int.from_bytes(value, "big", signed=True)
+        elif issubclass(jce_type, (FLOAT, DOUBLE)):
+            return float(int.from_bytes(value, "big", signed=True))
+        elif issubclass(jce_type, STRING):
+            return value.decode()
+    return value
+
+
 def get_jce_type(jce_id: int) -> Type[JceType]:
     return JceStruct.__jce_default_type__[jce_id]
 
 
+_GUESS_TYPES: Tuple[Tuple[type, Type[JceType]], ...] = (
+    (bytes, BYTE),
+    (bool, BOOL),
+    (int, INT),
+    (float, FLOAT),
+    (str, STRING),
+    (dict, MAP),
+    (list, LIST),
+)
+
+
 def guess_jce_type(object: Any) -> Type[JceType]:
-    types: Dict[type, Type[JceType]] = {
-        bytes: BYTE,
-        bool: BOOL,
-        int: INT,
-        float: FLOAT,
-        str: STRING,
-        dict: MAP,
-        list: LIST,
-    }
-    for t in types:
+    for t, jce_type in _GUESS_TYPES:
         if isinstance(object, t):
-            return types[t]
+            return jce_type
     raise TypeError("Unknown object type")
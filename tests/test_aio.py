@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import ValidationError
+
+from jce import JceField, JceStruct, types
+from tests.test_struct import SsoServerInfo
+
+
+class LargeStruct(JceStruct):
+    servers: types.LIST[SsoServerInfo] = JceField(jce_id=0)
+    numbers: types.LIST[types.INT64] = JceField([], jce_id=1)
+    named: types.MAP[types.STRING, SsoServerInfo] = JceField({}, jce_id=2)
+    main: SsoServerInfo = JceField(jce_id=3)
+
+
+def make_server(index: int) -> SsoServerInfo:
+    return SsoServerInfo(
+        server=f"server{index}", port=index, location="sz", extra="xxx"
+    )
+
+
+LARGE = LargeStruct(
+    servers=[make_server(i) for i in range(500)],
+    numbers=list(range(-300, 300)),
+    named={f"name{i}": make_server(i) for i in range(50)},
+    main=make_server(0),
+)
+
+
+async def count_switches(coroutine):
+    # number of times other tasks ran while the coroutine was working
+    switches = 0
+    done = False
+
+    async def other():
+        nonlocal switches
+        while not done:
+            switches += 1
+            await asyncio.sleep(0)
+
+    task = asyncio.ensure_future(other())
+    await asyncio.sleep(0)
+    try:
+        result = await coroutine
+    finally:
+        done = True
+        await task
+    return result, switches
+
+
+class TestAsync(unittest.TestCase):
+    def test_decode_async(self):
+        encoded = LARGE.encode()
+        decoded, switches = asyncio.run(
+            count_switches(
+                LargeStruct.decode_async(encoded, chunk_size=100, extra="xxx")
+            )
+        )
+        self.assertEqual(decoded, LargeStruct.decode(encoded, extra="xxx"))
+        self.assertEqual(decoded, LARGE)
+        self.assertGreater(switches, 10)
+
+    def test_encode_async(self):
+        encoded, switches = asyncio.run(
+            count_switches(LARGE.encode_async(chunk_size=100))
+        )
+        self.assertEqual(encoded, LARGE.encode())
+        self.assertGreater(switches, 5)
+
+    def test_executor(self):
+        encoded = LARGE.encode()
+
+        async def run():
+            with ThreadPoolExecutor(1) as executor:
+                decoded = await LargeStruct.decode_async(
+                    encoded,
+                    executor_threshold=1024,
+                    executor=executor,
+                    extra="xxx",
+                )
+                reencoded = await decoded.encode_async(
+                    executor_threshold=1024, executor=executor
+                )
+            return decoded, reencoded
+
+        decoded, reencoded = asyncio.run(run())
+        self.assertEqual(decoded, LARGE)
+        self.assertEqual(reencoded, encoded)
+
+    def test_decode_async_errors(self):
+        encoded = bytes.fromhex("09 00 02 0A 16 01 61 0B 00 01")
+        with self.assertRaises(ValidationError) as sync_error:
+            LargeStruct.decode(encoded, extra="xxx")
+        with self.assertRaises(ValidationError) as async_error:
+            asyncio.run(LargeStruct.decode_async(encoded, extra="xxx"))
+        self.assertEqual(
+            async_error.exception.errors(), sync_error.exception.errors()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
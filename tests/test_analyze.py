@@ -0,0 +1,88 @@
+import unittest
+
+from jce.analyze import analyze
+from jce import JceField, JceStruct, types
+
+
+class Location(JceStruct):
+    city: types.STRING = JceField(jce_id=0)
+
+
+class Server(JceStruct):
+    host: types.STRING = JceField(jce_id=0)
+    port: types.INT32 = JceField(jce_id=1)
+    location: Location = JceField(jce_id=2)
+
+
+class Response(JceStruct):
+    servers: types.LIST[Server] = JceField(jce_id=0)
+    index: types.MAP[types.STRING, types.INT32] = JceField({}, jce_id=1)
+    data: types.BYTES = JceField(b"", jce_id=20)
+
+
+RECORDS = [
+    Response(
+        servers=[Server(host="a", port=8080, location=Location(city="sz"))],
+        index={"a": 0} if i else {},
+        data=b"\x00" * i,
+    ).encode()
+    for i in range(3)
+]
+
+
+class TestAnalyze(unittest.TestCase):
+    def test_analyze_tags(self):
+        report = analyze(RECORDS[0])
+        self.assertEqual(report.records, 1)
+        self.assertEqual(report.total_bytes, len(RECORDS[0]))
+        self.assertEqual(
+            {path: entry.total_bytes for path, entry in report.paths.items()},
+            {
+                "0": 17,
+                "0[]": 14,
+                "0[].0": 3,
+                "0[].1": 3,
+                "0[].2": 6,
+                "0[].2.0": 4,
+                "1": 2,
+                "20": 4,
+            },
+        )
+        self.assertEqual(report.paths["20"].head_bytes, 2)
+        self.assertEqual(report.paths["0[].1"].types, {"INT16": 3})
+
+    def test_analyze_struct(self):
+        report = analyze(RECORDS, Response)
+        self.assertEqual(report.records, 3)
+        self.assertEqual(report.total_bytes, sum(map(len, RECORDS)))
+        # top level fields add up to the whole records
+        self.assertEqual(
+            sum(
+                entry.total_bytes
+                for path, entry in report.paths.items()
+                if path in ("servers", "index", "data")
+            ),
+            report.total_bytes,
+        )
+        city = report.paths["servers[].location.city"]
+        self.assertEqual((city.count, city.records), (3, 3))
+        key = report.paths["index{key}"]
+        self.assertEqual((key.count, key.records), (2, 2))
+        self.assertEqual(report.paths["index{value}"].types, {"ZERO_TAG": 2})
+        self.assertEqual(report.to_dict()["paths"]["data"]["count"], 3)
+        lines = report.format(limit=2).splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[2].startswith("servers "))
+
+    def test_analyze_errors(self):
+        with self.assertRaises(ValueError):
+            analyze(RECORDS[0][:-3])
+        with self.assertRaises(ValueError):
+            analyze(bytes.fromhex("0b"))
+
+        # a failed record leaves the report unchanged
+        report = analyze(RECORDS, Response)
+        before = report.to_dict()
+        with self.assertRaises(ValueError):
+            report.add(RECORDS[2][:-3])
+        self.assertEqual(report.to_dict(), before)
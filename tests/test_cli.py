@@ -0,0 +1,175 @@
+import io
+import os
+import json
+import base64
+import tempfile
+import unittest
+import contextlib
+
+from jce import JceField, JceStruct, types
+from jce.__main__ import (
+    CHUNK_SIZE,
+    main,
+    read_records,
+    iter_concatenated,
+    split_concatenated,
+)
+
+
+class CliStruct(JceStruct):
+    name: types.STRING = JceField(jce_id=0)
+    value: types.INT32 = JceField(jce_id=1)
+    data: types.BYTES = JceField(jce_id=2)
+
+
+class LazyCliStruct(JceStruct):
+    name: types.LAZY_STRING = JceField(jce_id=0)
+
+
+RECORDS = [
+    CliStruct(name=f"record{i}", value=i * 1000, data=b"\x00\x01").encode()
+    for i in range(4)
+]
+
+
+class TestCli(unittest.TestCase):
+    def run_main(self, content: bytes, *args: str):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "input")
+            output_path = os.path.join(directory, "output")
+            with open(input_path, "wb") as f:
+                f.write(content)
+            main(["-i", input_path, "-o", output_path, *args])
+            with open(output_path, encoding="utf-8") as f:
+                return [json.loads(line) for line in f]
+
+    def test_split_concatenated(self):
+        self.assertEqual(list(split_concatenated(b"".join(RECORDS))), RECORDS)
+
+    def test_chunked_input(self):
+        content = b"".join(RECORDS)
+        chunks = [content[i : i + 1] for i in range(len(content))]
+        self.assertEqual(list(iter_concatenated(chunks)), RECORDS)
+        with self.assertRaises(ValueError):
+            list(iter_concatenated([content[:-1]]))
+
+        # records are yielded as soon as the next one starts, also after
+        # one that spanned several chunks
+        big = CliStruct(name="big", value=0, data=bytes(1000)).encode()
+        fed = []
+
+        def chunks():
+            for chunk in [big[:500], big[500:], *RECORDS * 10]:
+                fed.append(chunk)
+                yield chunk
+
+        records = []
+        for record in iter_concatenated(chunks()):
+            records.append(record)
+            self.assertLessEqual(len(fed), len(records) + 2)
+        self.assertEqual(records, [big, *RECORDS * 10])
+
+        def corrupt():
+            yield RECORDS[0]
+            yield b"\x0e"
+            self.fail("read past corrupt data")
+
+        with self.assertRaises(ValueError):
+            list(iter_concatenated(corrupt()))
+
+        class SizedReads(io.BytesIO):
+            # the input must never be read as a whole
+            def read(self, size=-1):
+                assert size is not None and size > 0
+                return super().read(size)
+
+        records = [
+            CliStruct(name="big", value=i, data=bytes(CHUNK_SIZE)).encode()
+            for i in range(3)
+        ] + RECORDS
+        content = b"".join(records)
+        length = b"".join(
+            len(record).to_bytes(4, "big") + record for record in records
+        )
+        for format_, encode in [
+            ("raw", lambda data: data),
+            ("hex", lambda data: data.hex().encode()),
+            ("base64", base64.encodebytes),
+        ]:
+            for framing, data in [("concat", content), ("length", length)]:
+                with self.subTest(format=format_, framing=framing):
+                    stream = SizedReads(encode(data))
+                    self.assertEqual(
+                        list(read_records(stream, format_, framing)), records
+                    )
+
+    def test_length_framing(self):
+        content = b"".join(
+            len(record).to_bytes(4, "big") + record for record in RECORDS
+        )
+        self.assertEqual(
+            list(read_records(io.BytesIO(content), "raw", "length")), RECORDS
+        )
+
+    def test_hex_lines(self):
+        content = "\n".join(record.hex() for record in RECORDS) + "\nzz\n"
+        result = self.run_main(content.encode())
+        self.assertEqual(len(result), 5)
+        self.assertEqual(result[1], {"0": "record1", "1": 1000, "2": "AAE="})
+        self.assertEqual(result[4]["index"], 4)
+        self.assertIn("error", result[4])
+
+    def test_base64_struct_workers(self):
+        content = b"\n".join(base64.b64encode(record) for record in RECORDS)
+        result = self.run_main(
+            content,
+            "--format",
+            "base64",
+            "--struct",
+            f"{__name__}:CliStruct",
+            "--workers",
+            "2",
+            "--chunksize",
+            "1",
+        )
+        self.assertEqual(
+            [item["name"] for item in result],
+            [f"record{i}" for i in range(4)],
+        )
+        self.assertEqual(
+            result[3], {"name": "record3", "value": 3000, "data": "AAE="}
+        )
+
+    def test_lazy_struct(self):
+        result = self.run_main(
+            "\n".join(record.hex() for record in RECORDS).encode(),
+            "--struct",
+            f"{__name__}:LazyCliStruct",
+        )
+        self.assertEqual(result, [{"name": f"record{i}"} for i in range(4)])
+
+    def test_analyze(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "input")
+            with open(input_path, "w") as f:
+                f.write("\n".join(record.hex() for record in RECORDS))
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(
+                    [
+                        "analyze",
+                        "-i",
+                        input_path,
+                        "-s",
+                        "tests.test_cli:CliStruct",
+                        "--json",
+                    ]
+                )
+        report = json.loads(output.getvalue())
+        self.assertEqual(report["records"], 4)
+        self.assertEqual(set(report["paths"]), {"name", "value", "data"})
+        self.assertEqual(report["paths"]["data"]["types"], {"BYTES": 24})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from jce import Event, JceDecoder, types, iter_events
+
+
+class TestEvents(unittest.TestCase):
+    def test_scalar_events(self):
+        encoded = bytes.fromhex("10 7F 21 1F 90 F6 14 02 68 69 3C")
+        self.assertEqual(
+            list(iter_events(encoded)),
+            [
+                (Event.FIELD, 1, 0, 0),
+                (Event.VALUE, b"\x7f"),
+                (Event.FIELD, 2, 1, 2),
+                (Event.VALUE, 8080),
+                (Event.FIELD, 20, 6, 5),
+                (Event.VALUE, "hi"),
+                (Event.FIELD, 3, 12, 10),
+                (Event.VALUE, b"\x00"),
+            ],
+        )
+        for event in iter_events(encoded):
+            self.assertNotIsInstance(event[-1], types.JceType)
+
+    def test_container_events(self):
+        encoded = bytes.fromhex(
+            "0A 06 03 6F 6E 65 18 00 01 06 03 74 77 6F 1D 00 00 03 66 6F 6F "
+            "0B 19 00 01 0C 28 0C"
+        )
+        self.assertEqual(
+            list(iter_events(encoded)),
+            [
+                (Event.FIELD, 0, 10, 0),
+                (Event.STRUCT_START,),
+                (Event.FIELD, 0, 6, 1),
+                (Event.VALUE, "one"),
+                (Event.FIELD, 1, 8, 6),
+                (Event.MAP_START, 1),
+                (Event.FIELD, 0, 6, 9),
+                (Event.VALUE, "two"),
+                (Event.FIELD, 1, 13, 14),
+                (Event.VALUE, b"foo"),
+                (Event.MAP_END,),
+                (Event.STRUCT_END,),
+                (Event.FIELD, 1, 9, 22),
+                (Event.LIST_START, 1),
+                (Event.FIELD, 0, 12, 25),
+                (Event.VALUE, b"\x00"),
+                (Event.LIST_END,),
+                (Event.FIELD, 2, 8, 26),
+                (Event.MAP_START, 0),
+                (Event.MAP_END,),
+            ],
+        )
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            list(iter_events(bytes.fromhex("0A 10 01")))
+
+        class ShallowDecoder(JceDecoder):
+            max_depth = 1
+
+        with self.assertRaises(ValueError):
+            list(
+                iter_events(
+                    bytes.fromhex("09 00 01 09 00 01 00 01"),
+                    decoder=ShallowDecoder,
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+from tests.test_struct import SsoServerInfo
+from jce import JceField, JceStruct, RequestPacket, types
+
+
+class Envelope(JceStruct):
+    version: types.INT16 = JceField(0, jce_id=1)
+    packet_type: types.BYTE = JceField(bytes(1), jce_id=2)
+    message_type: types.INT32 = JceField(0, jce_id=3)
+    request_id: types.INT32 = JceField(0, jce_id=4)
+    servant_name: types.STRING = JceField(jce_id=5)
+    func_name: types.STRING = JceField(jce_id=6)
+    buffer: types.BYTES = JceField(jce_id=7)
+    timeout: types.INT32 = JceField(0, jce_id=8)
+    context: types.MAP[types.STRING, types.STRING] = JceField({}, jce_id=9)
+    status: types.MAP[types.STRING, types.STRING] = JceField({}, jce_id=10)
+
+
+INFO = SsoServerInfo(server="rcnb", port=8000, location="sz", extra="xxx")
+INNER = types.BYTES(SsoServerInfo.to_bytes(0, INFO))
+INT_PAYLOAD = types.INT.to_bytes(0, 1)
+
+
+class TestPacket(unittest.TestCase):
+    def test_decode_version3(self):
+        encoded = Envelope(
+            version=3,
+            request_id=7,
+            servant_name="svc",
+            func_name="fn",
+            buffer=types.MAP.to_bytes(0, {types.STRING("req"): INNER}),
+            context={"a": "b"},
+        ).encode()
+        packet = RequestPacket.decode(encoded)
+        self.assertEqual(packet.version, 3)
+        self.assertEqual(packet.request_id, 7)
+        self.assertEqual(packet.servant_name, "svc")
+        self.assertEqual(packet.func_name, "fn")
+        self.assertEqual(packet.context, {"a": "b"})
+        self.assertEqual(packet.names(), ["req"])
+        # values are views of the input until decoded
+        raw = packet.get_raw("req")
+        self.assertIsInstance(raw, memoryview)
+        self.assertIs(raw.obj, encoded)
+        self.assertEqual(raw, INNER)
+        self.assertEqual(packet.get("req", SsoServerInfo, extra="xxx"), INFO)
+        self.assertEqual(packet.encode(), encoded)
+
+    def test_decode_version2(self):
+        buffer = types.MAP.to_bytes(
+            0, {types.STRING("req"): types.MAP({types.STRING("T"): INNER})}
+        )
+        encoded = Envelope(
+            version=2, servant_name="s", func_name="f", buffer=buffer
+        ).encode()
+        packet = RequestPacket.decode(encoded)
+        self.assertEqual(packet.get("req", SsoServerInfo, extra="xxx"), INFO)
+        self.assertEqual(
+            packet.get("req", SsoServerInfo, "T", extra="xxx"), INFO
+        )
+        self.assertEqual(packet.encode(), encoded)
+
+    def test_encode(self):
+        packet = RequestPacket("svc", "fn", request_id=7, context={"a": "b"})
+        packet.put("req", INFO)
+        packet.put("body", INFO.encode())
+        encoded = packet.encode()
+        expected = Envelope(
+            version=3,
+            request_id=7,
+            servant_name="svc",
+            func_name="fn",
+            buffer=types.MAP.to_bytes(
+                0,
+                {types.STRING("req"): INNER, types.STRING("body"): INNER},
+            ),
+            context={"a": "b"},
+        ).encode()
+        self.assertEqual(encoded, expected)
+        self.assertEqual(packet.get("body", SsoServerInfo, extra="xxx"), INFO)
+
+        packet = RequestPacket("s", "f", version=2)
+        with self.assertRaises(ValueError):
+            packet.put("req", INFO)
+        packet.put("req", INFO, "T")
+        decoded = RequestPacket.decode(packet.encode())
+        self.assertEqual(decoded.get_raw("req", "T"), INNER)
+
+    def test_decode_errors(self):
+        encoded = RequestPacket("svc", "fn").encode()
+        with self.assertRaises(ValueError):
+            RequestPacket.decode(encoded[:-3])
+        packet = RequestPacket(
+            buffer=types.MAP.to_bytes(
+                0, {types.STRING("req"): types.BYTES(INT_PAYLOAD)}
+            )
+        )
+        with self.assertRaises(TypeError):
+            packet.get("req", SsoServerInfo)
+
+
+if __name__ == "__main__":
+    unittest.main()
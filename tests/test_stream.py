@@ -0,0 +1,82 @@
+import io
+import unittest
+
+from jce import JceField, JceStruct, StreamEncoder, types
+
+
+class Item(JceStruct):
+    name: types.STRING = JceField(jce_id=0)
+    value: types.INT64 = JceField(0, jce_id=1)
+
+
+class Response(JceStruct):
+    code: types.INT32 = JceField(jce_id=0)
+    ids: types.LIST[types.INT64] = JceField([], jce_id=1)
+    items: types.LIST[Item] = JceField([], jce_id=2)
+    message: types.STRING = JceField("", jce_id=3)
+
+
+class Unseekable(io.BytesIO):
+    def seekable(self):
+        return False
+
+
+class TestStream(unittest.TestCase):
+    def test_stream_encode(self):
+        items = [Item(name=f"item{i}", value=i) for i in range(3)]
+        fp = Unseekable()
+        with StreamEncoder(fp, Response, buffer_size=8) as encoder:
+            encoder.write("code", 1)
+            self.assertEqual(encoder.write_list("ids", range(300), 300), 300)
+            encoder.write_list("items", iter(items), count=3)
+            encoder.write("message", "done")
+        self.assertEqual(
+            fp.getvalue(),
+            Response(
+                code=1, ids=list(range(300)), items=items, message="done"
+            ).encode(),
+        )
+
+    def test_stream_patch_count(self):
+        fp = io.BytesIO(b"prefix")
+        fp.seek(0, io.SEEK_END)
+        with StreamEncoder(fp, Response) as encoder:
+            encoder.write("code", 1)
+            encoder.write_list("ids", (i for i in range(1000)))
+        data = fp.getvalue()
+        self.assertTrue(
+            data.startswith(b"prefix\x00\x01\x19\x02\x00\x00\x03\xe8")
+        )
+        self.assertEqual(
+            Response.decode(data[6:]), Response(code=1, ids=list(range(1000)))
+        )
+
+    def test_stream_errors(self):
+        encoder = StreamEncoder(io.BytesIO(), Response)
+        encoder.write("ids", [1])
+        with self.assertRaises(ValueError):
+            encoder.write("code", 1)
+        with self.assertRaises(KeyError):
+            encoder.write("unknown", 1)
+        with self.assertRaises(TypeError):
+            encoder.write_list("message", ["a"])
+        with self.assertRaises(ValueError):
+            StreamEncoder(Unseekable(), Response).write_list("ids", [1])
+
+        # a rejected write_list leaves the field unwritten
+        fp = io.BytesIO()
+        encoder = StreamEncoder(fp, Response)
+        with self.assertRaises(TypeError):
+            encoder.write_list("message", ["a"])
+        encoder.write("code", 1)
+        encoder.write("message", "done")
+        encoder.close()
+        self.assertEqual(
+            Response.decode(fp.getvalue()), Response(code=1, message="done")
+        )
+        with self.assertRaises(ValueError):
+            StreamEncoder(io.BytesIO(), Response).write_list("ids", [1], 2)
+        with self.assertRaises(ValueError):
+            # code is required
+            with StreamEncoder(io.BytesIO(), Response):
+                pass
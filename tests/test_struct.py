@@ -1,7 +1,18 @@
+import io
+import sys
+import mmap
+import pickle
+import tempfile
 import unittest
+import threading
+import subprocess
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 
-from jce import JceField, JceStruct, types
+from pydantic import ValidationError
+
+from jce.types import Dedup
+from jce import JceField, JceStruct, JceDecoder, types
 
 
 class SsoServerInfo(JceStruct):
@@ -16,6 +27,45 @@ class ServerListResponse(JceStruct):
     server_list: types.LIST[SsoServerInfo] = JceField(jce_id=2)
 
 
+class Server(JceStruct):
+    server: types.STRING = JceField(jce_id=1)
+    port: types.INT = JceField(jce_id=2)
+
+
+class PicklingServers(JceStruct):
+    servers: types.LIST[Server] = JceField(jce_id=0)
+    note: str = ""
+
+    class Config:
+        jce_pickle = True
+
+
+class PicklingResponse(ServerListResponse):
+    class Config:
+        jce_pickle = True
+
+
+class ServerPort(JceStruct):
+    port: types.INT = JceField(jce_id=2)
+
+    class Config:
+        jce_unknown_tags = "preserve"
+
+
+class ServerPorts(JceStruct):
+    servers: types.LIST[ServerPort] = JceField(jce_id=0)
+
+    class Config:
+        jce_unknown_tags = "preserve"
+
+
+class SkippedServerPort(JceStruct):
+    port: types.INT = JceField(jce_id=2)
+
+    class Config:
+        jce_unknown_tags = "skip"
+
+
 class TestStruct(unittest.TestCase):
     def test_struct_encode(self):
         byte = SsoServerInfo(
@@ -254,6 +304,414 @@ class TestStruct(unittest.TestCase):
             len(SsoServerInfo.decode_list(encoded, 2, extra="xxx")), 11
         )
 
+    def test_struct_list_extra_override(self):
+        servers = [
+            SsoServerInfo(server="s", port=i, location="x", extra="e")
+            for i in range(3)
+        ]
+        data = ServerListResponse(server_list=servers).encode()
+        self.assertEqual(
+            [
+                s.port
+                for s in SsoServerInfo.decode_list(data, 2, port=9, extra="e")
+            ],
+            [9, 9, 9],
+        )
+        self.assertEqual(
+            [
+                s.port
+                for s in SsoServerInfo.iter_list(data, 2, port=9, extra="e")
+            ],
+            [9, 9, 9],
+        )
+
+    def test_struct_iter_list(self):
+        servers = [
+            SsoServerInfo(server=f"s{i}", port=i, location="x", extra="e")
+            for i in range(100)
+        ]
+        data = (
+            types.BYTES.to_bytes(0, bytes(70000))
+            + ServerListResponse(server_list=servers).encode()
+            + types.INT.to_bytes(3, 1)
+        )
+
+        class ShortReads(io.RawIOBase):
+            def __init__(self, data: bytes):
+                self.data = io.BytesIO(data)
+
+            def readable(self) -> bool:
+                return True
+
+            def read(self, size: int = -1) -> bytes:
+                return self.data.read(min(size, 7))
+
+        with tempfile.TemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                self.assertEqual(
+                    list(SsoServerInfo.iter_list(m, 2, extra="e")), servers
+                )
+            for source in (data, io.BytesIO(data), ShortReads(data)):
+                self.assertEqual(
+                    list(SsoServerInfo.iter_list(source, 2, extra="e")),
+                    servers,
+                )
+
+        with self.assertRaises(TypeError):
+            next(SsoServerInfo.iter_list(data, 0))
+        with self.assertRaises(ValueError):
+            list(SsoServerInfo.iter_list(io.BytesIO(data[:-20]), 2, extra="e"))
+        with self.assertRaises(ValidationError):
+            next(SsoServerInfo.iter_list(data, 2))
+
+    def test_struct_omit_default(self):
+        class Field(JceStruct):
+            a: types.INT32 = JceField(0, jce_id=0, omit_default=True)
+            b: types.STRING = JceField("", jce_id=1)
+            c: types.LIST[types.INT32] = JceField(
+                default_factory=list, jce_id=2, omit_default=True
+            )
+            d: types.INT32 = JceField(jce_id=3, omit_default=True)
+
+        class Config(JceStruct):
+            a: types.INT32 = JceField(0, jce_id=0)
+            b: types.STRING = JceField("", jce_id=1, omit_default=False)
+            c: types.MAP[types.STRING, types.STRING] = JceField({}, jce_id=2)
+
+            class Config:
+                jce_omit_default = True
+
+        self.assertEqual(Field(d=0).encode(), bytes.fromhex("16 00 3C"))
+        self.assertEqual(Field.decode(bytes.fromhex("16 00 3C")), Field(d=0))
+        self.assertEqual(
+            Field.decode_native(bytes.fromhex("16 00 3C")),
+            {"a": 0, "b": "", "c": [], "d": 0},
+        )
+        self.assertEqual(
+            Field(a=1, c=[1], d=0).encode(),
+            bytes.fromhex("00 01 16 00 29 00 01 00 01 3C"),
+        )
+        self.assertEqual(Config().encode(), bytes.fromhex("16 00"))
+        self.assertEqual(Config.decode(bytes.fromhex("16 00")), Config())
+
+    def test_struct_encode_plain_values(self):
+        class Typed(JceStruct):
+            ids: types.LIST[types.INT64] = JceField(jce_id=0)
+            names: types.MAP[types.STRING, types.BYTES] = JceField(jce_id=1)
+            servers: types.LIST[SsoServerInfo] = JceField([], jce_id=2)
+
+        values = {
+            "ids": [1, 0, 2**40],
+            "names": {"a": b"x", "b": b""},
+            "servers": [
+                SsoServerInfo(server="a", port=1, location="x", extra="")
+            ],
+        }
+        self.assertEqual(
+            Typed.construct(**values).encode(), Typed(**values).encode()
+        )
+
+    def test_struct_encode_builtin_items(self):
+        class Builtin(JceStruct):
+            ids: types.LIST[int] = JceField(jce_id=0)
+            names: types.MAP[str, int] = JceField({}, jce_id=1)
+
+        value = Builtin(ids=[1, 2])
+        encoded = bytes.fromhex("09 00 02 00 01 00 02 18 0c")
+        self.assertEqual(value.encode(), encoded)
+        self.assertEqual(b"".join(value.encode_iov()), encoded)
+        self.assertEqual(
+            Builtin(ids=[], names={"a": 1}).encode(),
+            bytes.fromhex("09 0c 18 00 01 06 01 61 10 01"),
+        )
+
+    def test_struct_decode_schema(self):
+        class Nested(JceStruct):
+            servers: types.MAP[
+                types.STRING, types.LIST[SsoServerInfo]
+            ] = JceField(jce_id=0)
+
+        server = SsoServerInfo(server="a", port=1, location="x", extra="e")
+        data = Nested(servers={"k": [server, server]}).encode()
+        decoded = Nested.decode(data, extra="e")
+        self.assertEqual(decoded.servers, {"k": [server, server]})
+        self.assertIs(type(decoded.servers["k"][0]), SsoServerInfo)
+        self.assertIsNot(decoded.servers["k"][0], decoded.servers["k"][1])
+
+        with self.assertRaises(ValidationError) as context:
+            Nested.decode(data)
+        self.assertEqual(
+            context.exception.errors()[0]["loc"], ("servers", "k", 0, "extra")
+        )
+
+        data = ServerListResponse(server_list=[server]).encode()
+        self.assertEqual(
+            SsoServerInfo.decode_list(data, jce_id=2, extra="e"), [server]
+        )
+        with self.assertRaises(ValidationError):
+            SsoServerInfo.decode_list(data, jce_id=2)
+
+    def test_struct_decode_native(self):
+        data = ServerListResponse(
+            server_list=[
+                SsoServerInfo(server="a", port=0, location="x", extra=""),
+                SsoServerInfo(server="b", port=8000, location="y", extra=""),
+            ]
+        ).encode()
+        decoded = ServerListResponse.decode_native(data, extra="xxx")
+        self.assertEqual(
+            decoded,
+            {
+                "server_list": [
+                    {"server": "a", "port": 0, "location": "x", "extra": "xxx"},
+                    {
+                        "server": "b",
+                        "port": 8000,
+                        "location": "y",
+                        "extra": "xxx",
+                    },
+                ],
+                "extra": "xxx",
+            },
+        )
+        self.assertIs(type(decoded["server_list"][0]["port"]), int)
+        self.assertIs(type(decoded["server_list"][1]["server"]), str)
+
+    def test_struct_encode_iov(self):
+        class Blob(JceStruct):
+            name: types.STRING = JceField(jce_id=0)
+            data: types.BYTES = JceField(jce_id=1)
+            chunks: types.LIST[types.BYTES] = JceField([], jce_id=2)
+
+        class Upload(JceStruct):
+            blob: Blob = JceField(jce_id=0)
+            data: types.BYTES = JceField(b"", jce_id=20)
+
+        value = Upload(
+            blob=Blob(name="a", data=b"x" * 5000, chunks=[b"y", b"z" * 4096]),
+            data=b"small",
+        )
+        iov = value.encode_iov()
+        self.assertEqual(b"".join(iov), value.encode())
+        self.assertEqual(
+            [type(piece) for piece in iov],
+            [bytes, memoryview, bytes, memoryview, bytes],
+        )
+        self.assertIs(iov[1].obj, value.blob.data)
+
+        iov = value.encode_iov(threshold=1 << 20)
+        self.assertEqual(iov, [value.encode()])
+        self.assertEqual(
+            SsoServerInfo(
+                server="a", port=0, location="x", extra=""
+            ).encode_iov(),
+            [bytes.fromhex("16 01 61 2c 86 01 78")],
+        )
+
+    def test_struct_pickle(self):
+        value = PicklingServers(servers=[Server(server="a", port=1)], note="x")
+        data = pickle.dumps(value)
+        self.assertIn(value.encode(), data)
+        self.assertEqual(pickle.loads(data), value)
+
+        # non JCE fields of nested structs are not encoded
+        value = PicklingResponse(
+            server_list=[
+                SsoServerInfo(server="a", port=0, location="x", extra="e")
+            ]
+        )
+        self.assertNotIn(value.encode(), pickle.dumps(value))
+        self.assertEqual(pickle.loads(pickle.dumps(value)), value)
+
+    def test_struct_unknown_tags(self):
+        data = Server(server="a", port=1).encode()
+        value = ServerPort.decode(data)
+        self.assertEqual(value.__jce_unknown__, ((1, b"\x16\x01a"),))
+        self.assertEqual(value.encode(), data)
+        self.assertEqual(b"".join(value.encode_iov()), data)
+        self.assertEqual(value.copy().encode(), data)
+        self.assertEqual(pickle.loads(pickle.dumps(value)).encode(), data)
+
+        # nested structs follow their own config
+        data = PicklingServers(
+            servers=[Server(server="a", port=1), Server(server="b", port=2)]
+        ).encode() + types.INT.to_bytes(3, 2)
+        value = ServerPorts.decode(data)
+        self.assertEqual([server.port for server in value.servers], [1, 2])
+        self.assertEqual(value.__jce_unknown__, ((3, b"\x30\x02"),))
+        self.assertEqual(value.servers[1].__jce_unknown__, ((1, b"\x16\x01b"),))
+        self.assertEqual(value.encode(), data)
+
+        value = SkippedServerPort.decode(Server(server="a", port=1).encode())
+        self.assertEqual(value.port, 1)
+        self.assertIsNone(value.__jce_unknown__)
+        self.assertEqual(value.encode(), types.INT.to_bytes(2, 1))
+        # skipped tags are not decoded, but must be complete
+        with self.assertRaises(ValueError):
+            SkippedServerPort.decode(bytes.fromhex("16 05 61"))
+
+        # decoded as before by default
+        data = Server(server="a", port=1).encode() + types.INT.to_bytes(3, 2)
+        value = Server.decode(data)
+        self.assertIsNone(value.__jce_unknown__)
+        self.assertEqual(value.encode(), data[:-2])
+
+    def test_struct_decode_columns(self):
+        payloads = [
+            SsoServerInfo(server="a", port=0, location="x", extra="").encode(),
+            SsoServerInfo(
+                server="b", port=8000, location="y", extra=""
+            ).encode(),
+            # port missing, unknown tag 3 skipped
+            bytes.fromhex("16 01 63 30 05 86 01 7a"),
+        ]
+        columns, missing = SsoServerInfo.decode_columns(payloads)
+        self.assertEqual(
+            columns,
+            {
+                "server": ["a", "b", "c"],
+                "port": [0, 8000, None],
+                "location": ["x", "y", "z"],
+            },
+        )
+        self.assertEqual(missing["port"], [False, False, True])
+        self.assertEqual(missing["server"], [False, False, False])
+        self.assertIs(type(columns["port"][0]), int)
+
+        columns, missing = ServerListResponse.decode_columns(
+            [ServerListResponse(server_list=[]).encode(), b""]
+        )
+        self.assertEqual(columns, {"server_list": [[], None]})
+        self.assertEqual(missing, {"server_list": [False, True]})
+
+    def test_struct_decode_columns_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is not installed")
+
+        payloads = [
+            SsoServerInfo(
+                server="a", port=8000, location="x", extra=""
+            ).encode(),
+            bytes.fromhex("16 01 63"),
+        ]
+        columns, missing = SsoServerInfo.decode_columns(payloads, numpy=True)
+        self.assertEqual(columns["port"].dtype, numpy.int64)
+        self.assertEqual(columns["port"].tolist(), [8000, 0])
+        self.assertEqual(missing["port"].tolist(), [False, True])
+        self.assertEqual(columns["server"].tolist(), ["a", "c"])
+
+    def test_struct_decode_native_dedup(self):
+        servers = [
+            SsoServerInfo(server=f"s{i}", port=80, location="sz", extra="")
+            for i in range(10)
+        ]
+        data = ServerListResponse(server_list=servers).encode()
+        dedup = Dedup()
+        decoded = ServerListResponse.decode_native(data, dedup=dedup)
+        self.assertEqual(decoded, ServerListResponse.decode_native(data))
+        locations = [item["location"] for item in decoded["server_list"]]
+        self.assertTrue(all(item is locations[0] for item in locations))
+        self.assertEqual(dedup.hits, 9)
+        self.assertGreater(dedup.saved_bytes, 0)
+
+        # equal structs are shared, also across decodes
+        data = ServerListResponse(server_list=servers[:1] * 3).encode()
+        decoded = ServerListResponse.decode_native(data, dedup=dedup)
+        first, *others = decoded["server_list"]
+        self.assertTrue(all(item is first for item in others))
+        raw = JceDecoder.decode_bytes(data, native=True, dedup=dedup)
+        self.assertIs(raw[2][0], raw[2][1])
+
+        dedup = Dedup(max_size=1)
+        decoded = ServerListResponse.decode_native(data, dedup=dedup)
+        self.assertIsNot(decoded["server_list"][0], decoded["server_list"][1])
+        self.assertEqual(dedup.hits, 0)
+
+    def test_struct_decode_validates_once(self):
+        calls = []
+
+        class CountedString(types.STRING):
+            @classmethod
+            def validate(cls, v):
+                calls.append(v)
+                return super().validate(v)
+
+        class Item(JceStruct):
+            name: CountedString = JceField(jce_id=0)
+
+        class Container(JceStruct):
+            items: types.LIST[Item] = JceField(jce_id=0)
+            item: Item = JceField(jce_id=1)
+
+        encoded = Container(
+            items=[Item(name="a"), Item(name="b")], item=Item(name="c")
+        ).encode()
+        calls.clear()
+        decoded = Container.decode(encoded)
+        self.assertEqual(sorted(calls), ["a", "b", "c"])
+        self.assertEqual([item.name for item in decoded.items], ["a", "b"])
+        self.assertIsInstance(decoded.items, list)
+        self.assertIsInstance(decoded.items[0].name, CountedString)
+
+        # wrong wire types are still rejected
+        with self.assertRaises(ValidationError):
+            Container.decode(bytes.fromhex("09 00 01 00 01 1A 06 01 63 0B"))
+
+    def test_struct_decode_threads(self):
+        class ThreadStruct(JceStruct):
+            servers: types.LIST[SsoServerInfo] = JceField(jce_id=0)
+            names: types.MAP[types.STRING, types.INT32] = JceField(jce_id=1)
+
+        expected = ThreadStruct(
+            servers=[
+                SsoServerInfo(server=f"{i}", port=i, location="sz", extra="xxx")
+                for i in range(50)
+            ],
+            names={f"{i}": i for i in range(50)},
+        )
+        encoded = expected.encode()
+        barrier = threading.Barrier(8)
+
+        def decode(_):
+            # first access of the lazy fields races as well
+            barrier.wait()
+            return [
+                ThreadStruct.decode(encoded, extra="xxx") for _ in range(20)
+            ]
+
+        with ThreadPoolExecutor(8) as executor:
+            for results in executor.map(decode, range(8)):
+                for result in results:
+                    self.assertEqual(result, expected)
+
+    def test_struct_fields_deferred(self):
+        class DeferredStruct(JceStruct):
+            value: types.INT32 = JceField(jce_id=0)
+
+        self.assertNotIsInstance(
+            DeferredStruct.__dict__["__jce_fields__"], dict
+        )
+        self.assertEqual(
+            DeferredStruct(value=1).encode(), bytes.fromhex("00 01")
+        )
+        self.assertEqual(
+            list(DeferredStruct.__dict__["__jce_fields__"]), ["value"]
+        )
+
+    def test_lazy_import(self):
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                "import sys, jce; print('pydantic' in sys.modules)",
+            ]
+        )
+        self.assertEqual(output.strip(), b"False")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,90 @@
+import io
+import json
+import unittest
+
+from jce import JceField, JceStruct, types
+from jce.transcode import to_json, from_json, write_jsonl
+
+
+class Item(JceStruct):
+    id: types.INT = JceField(jce_id=0)
+    enabled: types.BOOL = JceField(jce_id=1)
+
+
+class Document(JceStruct):
+    name: types.STRING = JceField(jce_id=0)
+    blobs: types.MAP[types.STRING, types.BYTES] = JceField(jce_id=1)
+    items: types.LIST[Item] = JceField(jce_id=2)
+    scores: types.MAP[types.INT, types.DOUBLE] = JceField(jce_id=3)
+    main: Item = JceField(jce_id=4)
+
+
+DOCUMENT = Document(
+    name='a "quoted" name',
+    blobs={"key": b"\x00\xff"},
+    items=[Item(id=1, enabled=True), Item(id=-300, enabled=False)],
+    scores={2**40: 1.5},
+    main=Item(id=7, enabled=True),
+)
+
+
+class TestTranscode(unittest.TestCase):
+    def test_to_json_with_struct(self):
+        self.assertEqual(
+            json.loads(to_json(DOCUMENT.encode(), Document)),
+            {
+                "name": 'a "quoted" name',
+                "blobs": {"key": "AP8="},
+                "items": [
+                    {"id": 1, "enabled": True},
+                    {"id": -300, "enabled": False},
+                ],
+                "scores": {"1099511627776": 1.5},
+                "main": {"id": 7, "enabled": True},
+            },
+        )
+
+    def test_to_json_without_struct(self):
+        self.assertEqual(
+            json.loads(to_json(DOCUMENT.encode())),
+            {
+                "0": 'a "quoted" name',
+                "1": {"key": "AP8="},
+                "2": [{"0": 1, "1": 1}, {"0": -300, "1": 0}],
+                "3": {"1099511627776": 1.5},
+                "4": {"0": 7, "1": 1},
+            },
+        )
+
+    def test_container_map_key(self):
+        encoded = bytes.fromhex("08 00 01 09 00 02 00 01 00 02 16 01 77")
+        self.assertEqual(json.loads(to_json(encoded)), {"0": {"[1,2]": "w"}})
+
+    def test_round_trip(self):
+        encoded = DOCUMENT.encode()
+        self.assertEqual(
+            from_json(to_json(encoded, Document), Document), encoded
+        )
+        self.assertEqual(
+            Document.decode(from_json(to_json(encoded, Document), Document)),
+            DOCUMENT,
+        )
+        # without a schema, maps with plain string keys survive unchanged
+        plain = types.MAP.to_bytes(
+            0, {types.STRING("a"): types.LIST([types.INT(1)])}
+        )
+        self.assertEqual(from_json(to_json(plain)), plain)
+
+    def test_write_jsonl(self):
+        fp = io.StringIO()
+        encoded = DOCUMENT.encode()
+        self.assertEqual(write_jsonl([encoded, encoded], fp, Document), 2)
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            json.loads(lines[1])["main"], {"id": 7, "enabled": True}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,19 @@
+import json
+import zlib
 import unittest
-from typing import Dict
+from typing import Dict, TypeVar
 
-from jce import JceDecoder, types
+from pydantic import ValidationError
+
+from jce.__main__ import to_jsonable
+from jce import JceField, JceStruct, JceDecoder, types
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+S = TypeVar("S")
 
 
 class TestTypes(unittest.TestCase):
@@ -196,6 +208,29 @@ class TestTypes(unittest.TestCase):
         encoded = bytes.fromhex("19 0C")
         self.assertEqual(types.LIST.to_bytes(1, raw), encoded)
 
+    def test_typed_encode(self):
+        self.assertEqual(
+            types.LIST.to_bytes(1, [1, 0, 300], (types.INT64,)),
+            types.LIST.to_bytes(
+                1, [types.INT64(1), types.INT64(0), types.INT64(300)]
+            ),
+        )
+        self.assertEqual(
+            types.LIST.to_bytes(1, [[1], []], (types.LIST[types.INT32],)),
+            bytes.fromhex("19 00 02 09 00 01 00 01 09 0C"),
+        )
+        self.assertEqual(
+            types.MAP.to_bytes(
+                1,
+                {"one": {"two": b"foo"}},
+                (types.STRING, types.MAP[types.STRING, types.BYTES]),
+            ),
+            bytes.fromhex(
+                "18 00 01 06 03 6F 6E 65 18 00 01 "
+                "06 03 74 77 6F 1D 00 00 03 66 6F 6F"
+            ),
+        )
+
     def test_list_decode(self):
         raw = [types.INT(1), types.BOOL(False), types.STRING1("123")]
         encoded = bytes.fromhex("19 00 03 00 01 0C 06 03 31 32 33")
@@ -222,6 +257,275 @@ class TestTypes(unittest.TestCase):
         _, decoded, _ = JceDecoder.decode_single(encoded)
         self.assertEqual(types.BYTES.validate(decoded), raw)
 
+    def test_skip_field(self):
+        encoded = bytes.fromhex(
+            "1A 06 03 6F 6E 65 18 00 01 06 03 74 77 6F 1D 00 00 03 66 6F 6F "
+            "29 00 02 0C 16 01 61 1B 20 01"
+        )
+        self.assertEqual(JceDecoder.skip_field(encoded, 10, 1), 29)
+        self.assertEqual(JceDecoder.skip_field(encoded, 9, 22), 28)
+        self.assertEqual(JceDecoder.skip_field(encoded, 0, 30), 31)
+        with self.assertRaises(ValueError):
+            JceDecoder.skip_field(encoded[:20], 10, 1)
+
+    def test_decode_bytes_nested(self):
+        encoded = bytes.fromhex(
+            "0A 06 03 6F 6E 65 18 00 01 06 03 74 77 6F 1D 00 00 03 66 6F 6F "
+            "29 00 02 0C 16 01 61 0B 19 00 01 0A 10 01 0B 28 0C"
+        )
+        offset, expected = 0, {}
+        while offset < len(encoded):
+            jce_id, value, length = JceDecoder.decode_single(
+                encoded[offset:], extra="x"
+            )
+            expected[jce_id] = value
+            offset += length
+        self.assertEqual(JceDecoder.decode_bytes(encoded, extra="x"), expected)
+        self.assertEqual(
+            JceDecoder.decode_bytes(encoded, extra="x"),
+            {
+                0: {
+                    0: "one",
+                    1: {"two": b"foo"},
+                    2: [b"\x00", "a"],
+                    "extra": "x",
+                },
+                1: [{1: b"\x01", "extra": "x"}],
+                2: {},
+            },
+        )
+
+    def test_decode_bytes_native(self):
+        encoded = bytes.fromhex(
+            "0A 06 03 6F 6E 65 18 00 01 06 03 74 77 6F 1D 00 00 03 66 6F 6F "
+            "29 00 02 0C 16 01 61 0B 19 00 01 0A 10 01 0B 28 0C"
+        )
+        decoded = JceDecoder.decode_bytes(encoded, native=True)
+        self.assertEqual(decoded, JceDecoder.decode_bytes(encoded))
+        self.assertIs(type(decoded[0][0]), str)
+        self.assertIs(type(decoded[0][1]), dict)
+        self.assertIs(type(decoded[0][2]), list)
+        self.assertIs(type(decoded[1]), list)
+
+    def test_compressed(self):
+        class Inner(JceStruct):
+            ids: types.LIST[types.INT64] = JceField(jce_id=0)
+
+        class Outer(JceStruct):
+            body: types.COMPRESSED[Inner] = JceField(jce_id=0)
+
+        inner = Inner(ids=list(range(1000)))
+        encoded = Outer(body=inner).encode()
+        self.assertLess(len(encoded), len(inner.encode()))
+
+        decoded = Outer.decode(encoded)
+        self.assertEqual(zlib.decompress(decoded.body.data), inner.encode())
+        self.assertEqual(
+            repr(decoded.body), f"COMPRESSED(<{len(encoded) - 5} bytes>)"
+        )
+        self.assertEqual(decoded.body.value, inner)
+        self.assertEqual(Outer.decode(decoded.encode()).body.value, inner)
+        self.assertEqual(Outer.decode_native(encoded), {"body": inner.dict()})
+        self.assertEqual(Outer(body={"ids": [1]}).body.value, Inner(ids=[1]))
+
+        class Stored(types.COMPRESSED[S]):
+            threshold = 100
+
+        class Small(JceStruct):
+            body: Stored[Inner] = JceField(jce_id=0)
+
+        # stored as a zlib level 0 stream
+        encoded = Small(body=Inner(ids=[1])).encode()
+        self.assertEqual(
+            encoded,
+            bytes.fromhex(
+                "0D 00 00 10 78 01 01 05 00 fa ff 09 00 01 00 01 00 36 00 0c"
+            ),
+        )
+        self.assertEqual(Small.decode(encoded).body.value, Inner(ids=[1]))
+
+        self.assertEqual(
+            json.loads(Outer(body=Inner(ids=[1])).json()),
+            {"body": {"ids": [1]}},
+        )
+        self.assertEqual(
+            to_jsonable(Small.decode(encoded)), {"body": {"ids": [1]}}
+        )
+
+        # plain bodies, corrupt and oversized data are rejected
+        with self.assertRaises(ValueError):
+            Small.decode(bytes.fromhex("0D 00 00 05 09 00 01 00 01")).body.value
+        with self.assertRaises(ValueError):
+            Small.decode(encoded[:-1]).body.value
+
+        class Limited(types.COMPRESSED[S]):
+            max_size = 100
+
+        class Bounded(JceStruct):
+            body: Limited[Inner] = JceField(jce_id=0)
+
+        decoded = Bounded.decode(Outer(body=inner).encode())
+        with self.assertRaises(ValueError):
+            decoded.body.value
+
+    def test_lazy_string(self):
+        class Replace(types.LAZY_STRING):
+            errors = "replace"
+
+        class Message(JceStruct):
+            text: types.LAZY_STRING = JceField(jce_id=0)
+            tags: types.LIST[types.LAZY_STRING] = JceField([], jce_id=1)
+            raw: Replace = JceField("", jce_id=2)
+
+        encoded = Message(text="héllo", tags=["a" * 300]).encode()
+        self.assertEqual(
+            encoded,
+            bytes.fromhex("06 06 68 c3 a9 6c 6c 6f 19 00 01 07 00 00 01 2c")
+            + b"a" * 300
+            + bytes.fromhex("26 00"),
+        )
+
+        decoded = Message.decode(encoded)
+        self.assertEqual(repr(decoded.text), "LAZY_STRING(<6 bytes>)")
+        self.assertEqual(decoded.tags[0].data, b"a" * 300)
+        self.assertEqual(decoded.encode(), encoded)
+        self.assertEqual(decoded.text, "héllo")
+        self.assertEqual(str(decoded.text), "héllo")
+        self.assertEqual(decoded, Message(text="héllo", tags=["a" * 300]))
+
+        decoded = Message.decode(bytes.fromhex("06 00 26 02 ff 61"))
+        self.assertEqual(decoded.raw.value, "\ufffda")
+        self.assertEqual(
+            decoded.encode(), bytes.fromhex("06 00 19 0c 26 02 ff 61")
+        )
+        with self.assertRaises(UnicodeDecodeError):
+            Message.decode(bytes.fromhex("06 01 ff")).text.value
+
+        decoded = Message.decode(encoded)
+        self.assertEqual(
+            decoded.json(),
+            '{"text": "h\\u00e9llo", "tags": ["%s"], "raw": ""}' % ("a" * 300),
+        )
+
+    def test_lazy_map(self):
+        class Profile(JceStruct):
+            name: types.STRING = JceField(jce_id=0)
+
+        class Profiles(JceStruct):
+            by_id: types.MAP[types.INT64, Profile] = JceField(jce_id=0)
+            scores: types.MAP[types.STRING, types.LIST[types.INT32]] = JceField(
+                jce_id=1
+            )
+
+        class LazyProfiles(JceStruct):
+            by_id: types.LAZY_MAP[types.INT64, Profile] = JceField(jce_id=0)
+            scores: types.LAZY_MAP[
+                types.STRING, types.LIST[types.INT32]
+            ] = JceField(jce_id=1)
+
+        profiles = Profiles(
+            by_id={
+                0: Profile(name="a"),
+                7: Profile(name="b"),
+                70000: Profile(name=""),
+            },
+            scores={"x": [1, 2]},
+        )
+        encoded = bytes.fromhex(
+            "08 00 03"
+            "0c 1a 06 01 61 1b"
+            "00 07 1a 06 01 62 1b"
+            "02 00 01 11 70 1a 06 00 1b"
+            "18 00 01 06 01 78 19 00 02 00 01 00 02"
+        )
+        self.assertEqual(profiles.encode(), encoded)
+
+        decoded = LazyProfiles.decode(encoded)
+        by_id = decoded.by_id
+        self.assertEqual(repr(by_id), "LAZY_MAP(<3 items>)")
+        self.assertEqual(len(by_id), 3)
+        self.assertEqual(list(by_id), [0, 7, 70000])
+        self.assertIn(70000, by_id)
+        self.assertNotIn(8, by_id)
+        # values are decoded on lookup only
+        self.assertEqual(by_id._values, {})
+        self.assertEqual(by_id[7], Profile(name="b"))
+        self.assertEqual(list(by_id._values), [7])
+        self.assertIsNone(by_id.get(8))
+        with self.assertRaises(KeyError):
+            by_id[8]
+        self.assertEqual(decoded.scores["x"], [1, 2])
+        self.assertIs(type(decoded.scores["x"][0]), types.INT32)
+        self.assertEqual(dict(by_id.items()), profiles.by_id)
+        self.assertEqual(decoded.encode(), encoded)
+        self.assertEqual(
+            json.loads(decoded.json()),
+            {
+                "by_id": {
+                    "0": {"name": "a"},
+                    "7": {"name": "b"},
+                    "70000": {"name": ""},
+                },
+                "scores": {"x": [1, 2]},
+            },
+        )
+        self.assertEqual(
+            to_jsonable(decoded),
+            {
+                "by_id": {
+                    0: {"name": "a"},
+                    7: {"name": "b"},
+                    70000: {"name": ""},
+                },
+                "scores": {"x": [1, 2]},
+            },
+        )
+
+        value = LazyProfiles(by_id={1: {"name": "c"}}, scores={})
+        self.assertEqual(value.by_id[1], Profile(name="c"))
+        self.assertEqual(LazyProfiles.decode(value.encode()).by_id, value.by_id)
+        decoded = Profiles.decode(value.encode())
+        self.assertEqual(decoded.by_id, {1: Profile(name="c")})
+
+        # a MAP head for other two element schema nodes is no lazy map
+        class Other(JceStruct):
+            profiles: types.LIST[Profile] = JceField([], jce_id=2)
+            text: types.LAZY_STRING = JceField("", jce_id=3)
+
+        self.assertEqual(Other.decode(bytes.fromhex("280c")).profiles, [])
+        with self.assertRaises(ValidationError):
+            Other.decode(bytes.fromhex("380c"))
+
+    @unittest.skipUnless(zstandard, "zstandard is not installed")
+    def test_compressed_zstd(self):
+        class Inner(JceStruct):
+            ids: types.LIST[types.INT64] = JceField(jce_id=0)
+
+        class Zstd(types.COMPRESSED[S]):
+            codec = "zstd"
+
+        class Outer(JceStruct):
+            body: Zstd[Inner] = JceField(jce_id=0)
+
+        inner = Inner(ids=list(range(1000)))
+        encoded = Outer(body=inner).encode()
+        self.assertEqual(encoded[5:9], b"\x28\xb5\x2f\xfd")
+        self.assertEqual(Outer.decode(encoded).body.value, inner)
+
+    def test_decode_bytes_deep(self):
+        class DeepDecoder(JceDecoder):
+            max_depth = 5000
+
+        encoded = bytes.fromhex("00 01")
+        for _ in range(3000):
+            encoded = bytes.fromhex("09 00 01") + encoded
+        decoded = DeepDecoder.decode_bytes(encoded)[0]
+        for _ in range(2999):
+            decoded = decoded[0]
+        self.assertEqual(decoded, [b"\x01"])
+        with self.assertRaises(ValueError):
+            JceDecoder.decode_bytes(encoded)
+
 
 if __name__ == "__main__":
     unittest.main()